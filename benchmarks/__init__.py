@@ -0,0 +1,4 @@
+"""
+Throughput benchmarks for pma_python against a local PMA.core stand-in server; run them with
+    python -m benchmarks --help
+"""
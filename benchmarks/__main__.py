@@ -0,0 +1,77 @@
+"""
+Run the benchmark scenarios against a local stand-in server and print a table (or JSON) of the results, e.g.
+    python -m benchmarks --latency 20 --bandwidth 100 --workers 16
+    python -m benchmarks --scenarios tiles_serial tiles_concurrent --tiles 400 --json results.json
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.scenarios import SCENARIOS, run_scenario
+from benchmarks.server import StandInServer
+
+_COLUMNS = [("scenario", "{:<24}", 24), ("items", "{:>7}", 7), ("seconds", "{:>8.2f}", 8),
+            ("items_per_second", "{:>10.1f}", 10), ("mb_per_second", "{:>8.2f}", 8), ("requests", "{:>8}", 8),
+            ("p50_ms", "{:>8.1f}", 8), ("p95_ms", "{:>8.1f}", 8), ("p99_ms", "{:>8.1f}", 8),
+            ("peak_rss_mb", "{:>8.1f}", 8)]
+_HEADERS = ["scenario", "items", "seconds", "items/s", "MB/s", "requests", "p50 ms", "p95 ms", "p99 ms", "RSS MB"]
+
+
+def _row(result):
+    cells = []
+    for (key, fmt, width) in _COLUMNS:
+        value = result.get(key)
+        cells.append(" " * (width - 1) + "-" if value is None else fmt.format(value))
+    return " ".join(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark pma_python against a local PMA.core stand-in server")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS),
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--latency", type=float, default=10.0, help="milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="milliseconds of random latency variation")
+    parser.add_argument("--bandwidth", type=float, default=None, help="MB/s shared by all responses")
+    parser.add_argument("--workers", type=int, default=8, help="concurrency of the concurrent scenarios")
+    parser.add_argument("--tiles", type=int, default=256, help="number of tiles to fetch (rounded to a square)")
+    parser.add_argument("--tile-size", type=int, default=512)
+    parser.add_argument("--regions", type=int, default=32, help="number of regions to fetch")
+    parser.add_argument("--region-size", type=int, default=1024, help="width and height of every region")
+    parser.add_argument("--slides", type=int, default=100, help="number of slides to get the information of")
+    parser.add_argument("--repeat", type=int, default=1, help="run every scenario this many times")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios = list(args.scenarios)
+    if "tiles_async" in scenarios:
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            print("Skipping tiles_async: aiohttp is not installed", file=sys.stderr)
+            scenarios.remove("tiles_async")
+
+    config = {"workers": args.workers, "tiles": args.tiles, "regions": args.regions,
+              "region_size": args.region_size, "slides": args.slides, "zoomlevel": None}
+    results = []
+    with StandInServer(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                       bandwidth=args.bandwidth * 1e6 if args.bandwidth else None, tile_size=args.tile_size,
+                       slides_per_directory=max(1, -(-args.slides // 4))) as server:
+        print("Stand-in server at", server.url, "- latency", args.latency, "ms,",
+              "bandwidth", "unlimited" if not args.bandwidth else "%g MB/s" % args.bandwidth)
+        print(" ".join(header.rjust(width) if i else header.ljust(width)
+                       for (i, (header, (_, _, width))) in enumerate(zip(_HEADERS, _COLUMNS))))
+        for name in scenarios:
+            for _ in range(args.repeat):
+                result = run_scenario(name, server, config)
+                results.append(result)
+                print(_row(result), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
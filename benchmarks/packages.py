@@ -0,0 +1,56 @@
+"""
+Synthetic slide packages for the transfer benchmarks.
+
+The files are sparse where the file system supports it: a package of many gigabytes takes next to no disk space
+and reads back (as zeros, after a small random header per file) without touching the disk. Layouts:
+- 'svs': a single file, like Aperio SVS or most TIFF-based formats
+- 'mrxs': a small .mrxs file and a directory with the same name holding Slidedat.ini, Index.dat and
+  data_files equally sized DataNNNN.dat files, like 3DHistech MRXS
+- 'vsi': a small .vsi file and a directory with the same name holding stack directories with one frame_t.ets
+  each (a small overview and the full-resolution stack), like Olympus VSI
+"""
+import os
+
+__all__ = ["LAYOUTS", "make_package"]
+
+LAYOUTS = ("svs", "mrxs", "vsi")
+
+
+def _make_file(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(os.urandom(min(size, 4096)))
+        if size > 4096:
+            f.truncate(size)
+
+
+def make_package(directory, layout, size, name="slide", data_files=16):
+    """
+    Create a slide package of layout (see LAYOUTS) with size bytes in total in directory.
+    Returns the path of the main file and a list of (path relative to directory, absolute path) pairs for
+    all files of the package, main file last
+    """
+    if layout not in LAYOUTS:
+        raise ValueError("layout must be one of " + ", ".join(LAYOUTS))
+    files = []
+    if layout == "svs":
+        files.append((name + ".svs", size))
+    elif layout == "mrxs":
+        small = 64 * 1024
+        data_size = max(1, (size - 3 * small) // data_files)
+        files.append((name + "/Slidedat.ini", small))
+        files.append((name + "/Index.dat", small))
+        files.extend((name + "/Data%04d.dat" % i, data_size) for i in range(data_files))
+        files.append((name + ".mrxs", max(1, size - 2 * small - data_size * data_files)))
+    else:
+        small = 1024 * 1024
+        files.append((name + "/stack10001/frame_t.ets", small))
+        files.append((name + "/stack1/frame_t.ets", max(1, size - 2 * small)))
+        files.append((name + ".vsi", small))
+
+    result = []
+    for (relative, file_size) in files:
+        path = os.path.join(directory, *relative.split("/"))
+        _make_file(path, file_size)
+        result.append((relative, path))
+    return result[-1][1], result
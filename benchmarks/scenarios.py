@@ -0,0 +1,201 @@
+"""
+Benchmark scenarios: the same work done serially (one request at a time, the way most scripts use pma_python) and
+concurrently (through a thread pool, or the library's own concurrent APIs).
+
+Every scenario is a function scenario(sessionID, config) that does its work against the slide tree of a
+StandInServer and returns the number of items (tiles, regions, slides, ...) it retrieved. run_scenario()
+times it in a fresh session and collects throughput, latency and memory figures.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from pma_python import core
+
+__all__ = ["SCENARIOS", "run_scenario"]
+
+
+def _slides(config):
+    return sorted(config["server"].slides)[:config["slides"]]
+
+
+def _directories(config):
+    server = config["server"]
+    return server.directories[server.root]
+
+
+def _tile_grid(config):
+    side = int(config["tiles"] ** 0.5)
+    return [(x, y) for y in range(side) for x in range(side)]
+
+
+def _regions(config):
+    size = config["region_size"]
+    return [(x * size, y * size) for y in range(4) for x in range(max(1, config["regions"] // 4))][:config["regions"]]
+
+
+def _map(fn, items, workers):
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(fn, items))
+
+
+def slide_info_serial(sessionID, config):
+    for slide in _slides(config):
+        core.get_slide_info(slide, sessionID)
+    return len(_slides(config))
+
+
+def slide_info_concurrent(sessionID, config):
+    return len(_map(lambda slide: core.get_slide_info(slide, sessionID), _slides(config), config["workers"]))
+
+
+def get_slides_serial(sessionID, config):
+    return sum(len(core.get_slides(directory, sessionID)) for directory in _directories(config))
+
+
+def get_slides_concurrent(sessionID, config):
+    return sum(len(slides) for slides in _map(lambda directory: core.get_slides(directory, sessionID),
+                                                _directories(config), config["workers"]))
+
+
+def get_slides_recursive(sessionID, config):
+    return len(core.get_slides(config["server"].root, sessionID, recursive=True))
+
+
+def tiles_serial(sessionID, config):
+    slide = _slides(config)[0]
+    for (x, y) in _tile_grid(config):
+        core.get_tile(slide, x, y, config["zoomlevel"], sessionID=sessionID)
+    return len(_tile_grid(config))
+
+
+def tiles_concurrent(sessionID, config):
+    slide = _slides(config)[0]
+    side = int(config["tiles"] ** 0.5)
+    return sum(1 for _ in core.get_tiles(slide, 0, 0, side, side, config["zoomlevel"], sessionID=sessionID,
+                                         workers=config["workers"]))
+
+
+def tiles_async(sessionID, config):
+    slide = _slides(config)[0]
+    side = int(config["tiles"] ** 0.5)
+
+    async def fetch():
+        count = 0
+        async for _ in core.get_tiles_async(slide, 0, 0, side, side, config["zoomlevel"], sessionID=sessionID,
+                                            max_in_flight=config["workers"]):
+            count += 1
+        await core.close_async_sessions(sessionID)
+        return count
+
+    return asyncio.run(fetch())
+
+
+def region_serial(sessionID, config):
+    slide = _slides(config)[0]
+    size = config["region_size"]
+    for (x, y) in _regions(config):
+        core.get_region(slide, x, y, size, size, sessionID=sessionID)
+    return len(_regions(config))
+
+
+def region_concurrent(sessionID, config):
+    slide = _slides(config)[0]
+    size = config["region_size"]
+    return len(_map(lambda xy: core.get_region(slide, xy[0], xy[1], size, size, sessionID=sessionID),
+                    _regions(config), config["workers"]))
+
+
+SCENARIOS = {
+    "slide_info_serial": slide_info_serial,
+    "slide_info_concurrent": slide_info_concurrent,
+    "get_slides_serial": get_slides_serial,
+    "get_slides_concurrent": get_slides_concurrent,
+    "get_slides_recursive": get_slides_recursive,
+    "tiles_serial": tiles_serial,
+    "tiles_concurrent": tiles_concurrent,
+    "tiles_async": tiles_async,
+    "region_serial": region_serial,
+    "region_concurrent": region_concurrent,
+}
+
+
+def _rss():
+    """
+    Current resident set size in bytes, or None where it can't be determined cheaply
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # not the current but the peak size of the process so far; kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class _PeakRSS:
+    """
+    Sample the resident set size in the background to find its peak while a scenario runs
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = _rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            rss = _rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        rss = _rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+def run_scenario(name, server, config):
+    """
+    Run scenario name against server in a session of its own; return a dictionary with the number of items,
+    the wall time, items per second, MB/s received, the number of requests and their latency percentiles (ms)
+    and the peak resident set size (MB) during the run
+    """
+    sessionID = "bench-" + uuid4().hex
+    core.register_session_id(sessionID, server.url)
+    config = dict(config, server=server)
+    try:
+        with _PeakRSS() as rss:
+            start = time.perf_counter()
+            items = SCENARIOS[name](sessionID, config)
+            seconds = time.perf_counter() - start
+        total = core.get_stats(sessionID).get("total", {})
+    finally:
+        core.disconnect(sessionID)
+        core.reset_stats(sessionID)
+    latency = total.get("latency", {})
+
+    def ms(key):
+        return None if latency.get(key) is None else latency[key] * 1000
+
+    return {"scenario": name, "items": items, "seconds": seconds,
+            "items_per_second": items / seconds if seconds > 0 else None,
+            "mb_per_second": total.get("bytes_received", 0) / 1e6 / seconds if seconds > 0 else None,
+            "requests": total.get("requests", 0), "p50_ms": ms("p50"), "p95_ms": ms("p95"), "p99_ms": ms("p99"),
+            "peak_rss_mb": None if rss.peak is None else rss.peak / 1e6}
@@ -0,0 +1,222 @@
+"""
+A lightweight stand-in for PMA.core, to benchmark pma_python without a live server.
+
+It serves a synthetic slide tree through the endpoints pma_python uses most: tile, region, api/json/GetImageInfo,
+api/json/GetFiles, api/json/GetDirectories, api/json/GetRootDirectories and api/json/DeAuthenticate.
+Every response can be delayed (latency, with optional jitter) and all responses together can be limited to a
+bandwidth, like a shared link between client and server. Any session ID is accepted; register it with core.register_session_id().
+
+Run it on its own with
+    python -m benchmarks.server --port 54001 --latency 20 --bandwidth 50
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from PIL import Image
+
+__all__ = ["StandInServer"]
+
+
+class _Throttle:
+    """
+    Token bucket shared by all connections: at most rate bytes per second leave the server
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.available = 0.0
+        self.stamp = time.perf_counter()
+
+    def consume(self, n):
+        with self.lock:
+            now = time.perf_counter()
+            # allow bursts of at most a tenth of a second worth of data
+            self.available = min(self.rate / 10, self.available + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.available -= n
+            wait = -self.available / self.rate if self.available < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    chunk_size = 64 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json", code=200):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        throttle = self.server.stand_in.throttle
+        for start in range(0, len(body), self.chunk_size):
+            chunk = body[start:start + self.chunk_size]
+            if throttle is not None:
+                throttle.consume(len(chunk))
+            self.wfile.write(chunk)
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        if stand_in.latency > 0 or stand_in.jitter > 0:
+            time.sleep(max(0.0, stand_in.latency + random.uniform(-stand_in.jitter, stand_in.jitter)))
+        parts = urlsplit(self.path)
+        query = {k: v[0] for (k, v) in parse_qs(parts.query).items()}
+        path = parts.path.rstrip("/")
+        endpoint = path.rsplit("/", 1)[-1]
+        stand_in.count(endpoint)
+
+        if endpoint == "tile":
+            return self._send(stand_in.tile(int(query.get("x", 0)), int(query.get("y", 0))), "image/jpeg")
+        if endpoint == "region":
+            return self._send(stand_in.region(float(query.get("width", 0)) * float(query.get("scale", 1)),
+                                              float(query.get("height", 0)) * float(query.get("scale", 1))),
+                              "image/jpeg")
+        if endpoint == "GetImageInfo":
+            slide = query.get("pathOrUid", "")
+            if slide not in stand_in.slides:
+                return self._send({"Code": 404, "Message": "Slide not found: " + slide})
+            return self._send(stand_in.slide_info(slide))
+        if endpoint == "GetFiles":
+            return self._send(stand_in.files.get(query.get("path", "").strip("/"), []))
+        if endpoint == "GetDirectories":
+            return self._send(stand_in.directories.get(query.get("path", "").strip("/"), []))
+        if endpoint == "GetRootDirectories":
+            return self._send([stand_in.root])
+        if endpoint == "DeAuthenticate":
+            return self._send(True)
+        return self._send({"Code": 404, "Message": "Not supported by the stand-in server: " + path}, code=404)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StandInServer:
+    """
+    Serve a synthetic slide tree of directories x slides_per_directory slides of width x height pixels, under the
+    root directory root. latency and jitter are in seconds, bandwidth in bytes per second (None: unlimited).
+    Use as a context manager, or call start() and stop(); url holds the address to register sessions with
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, bandwidth=None, root="Bench",
+                 directories=4, slides_per_directory=25, width=100000, height=80000, tile_size=512,
+                 tile_quality=80, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = _Throttle(bandwidth) if bandwidth else None
+        self.root = root
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+        self.directories = {root: [root + "/dir%02d" % d for d in range(directories)]}
+        self.files = {}
+        for directory in self.directories[root]:
+            self.directories[directory] = []
+            self.files[directory] = [directory + "/slide%03d.svs" % s for s in range(slides_per_directory)]
+        self.slides = set(s for files in self.files.values() for s in files)
+
+        # a noisy, smooth texture compresses roughly like tissue; a few variants keep tiles from being identical
+        rng = np.random.default_rng(seed)
+        self._texture = Image.fromarray(rng.integers(0, 256, (tile_size // 8, tile_size // 8, 3), dtype=np.uint8)) \
+            .resize((tile_size * 2, tile_size * 2), Image.BICUBIC)
+        self._tiles = []
+        for i in range(16):
+            offset = (i % 4 * tile_size // 4, i // 4 * tile_size // 4)
+            buffer = io.BytesIO()
+            self._texture.crop(offset + (offset[0] + tile_size, offset[1] + tile_size)) \
+                .save(buffer, "JPEG", quality=tile_quality)
+            self._tiles.append(buffer.getvalue())
+        self._regions = {}
+        self._tile_quality = tile_quality
+
+    def count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def tile(self, x, y):
+        return self._tiles[(x * 7 + y * 3) % len(self._tiles)]
+
+    def region(self, width, height):
+        size = (max(1, int(round(width))), max(1, int(round(height))))
+        with self._lock:
+            content = self._regions.get(size)
+        if content is None:
+            buffer = io.BytesIO()
+            self._texture.resize(size, Image.BILINEAR).save(buffer, "JPEG", quality=self._tile_quality)
+            content = buffer.getvalue()
+            with self._lock:
+                self._regions[size] = content
+        return content
+
+    def slide_info(self, slide):
+        max_zoomlevel = max(0, int(np.ceil(np.log2(max(self.width, self.height) / self.tile_size))))
+        return {"Filename": slide, "Width": self.width, "Height": self.height, "TileSize": self.tile_size,
+                "MaxZoomLevel": max_zoomlevel, "NumberOfZoomLevels": max_zoomlevel + 1,
+                "MicrometresPerPixelX": 0.25, "MicrometresPerPixelY": 0.25,
+                "LastModified": "/Date(1600000000000)/",
+                "TimeFrames": [{"Layers": [{"Channels": [{"Name": "RGB"}]}]}]}
+
+    @property
+    def url(self):
+        return "http://%s:%d/" % (self.host, self._server.server_address[1])
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.stand_in = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic slide tree like PMA.core does")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54001)
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="milliseconds of random latency variation")
+    parser.add_argument("--bandwidth", type=float, default=None, help="MB/s shared by all responses")
+    args = parser.parse_args(argv)
+    server = StandInServer(args.host, args.port, args.latency / 1000, args.jitter / 1000,
+                           args.bandwidth * 1e6 if args.bandwidth else None).start()
+    print("Serving", len(server.slides), "slides at", server.url, "(Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
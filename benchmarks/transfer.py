@@ -0,0 +1,161 @@
+"""
+Transfer benchmarks: upload and download synthetic slide packages through a local TransferStandInServer and
+report time-to-complete, throughput and peak memory, e.g.
+    python -m benchmarks.transfer --size 4 --layouts svs mrxs vsi --bandwidth 500
+    python -m benchmarks.transfer --scenarios upload_large_s3 download --size 8 --json transfer.json
+
+Scenarios:
+- upload_legacy_filesystem, upload_legacy_s3, upload_legacy_azure: core.upload_legacy, with files posted to
+  PMA.core, or PUT to presigned S3 or Azure URLs in one request per file
+- upload_large_s3, upload_large_azure: core.upload_file_over_5gb (PmaCoreClient), with multipart S3 uploads
+  (PmaCoreClient.upload_parts_to_s3) or Azure block uploads (PmaCoreClient.upload_file_to_azure)
+- download: core.download
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from pma_python import core
+
+from benchmarks.packages import LAYOUTS, make_package
+from benchmarks.scenarios import _PeakRSS
+from benchmarks.transfer_server import TransferStandInServer
+
+__all__ = ["TRANSFER_SCENARIOS", "run_transfer_scenario"]
+
+_UPLOAD_DIRECTORY = "Bench/upload"
+
+
+def _upload_legacy(storage):
+    def scenario(sessionID, server, package, workdir):
+        server.storage = storage
+        # upload_legacy asks PMA.start (the local lite server) for the files of the slide to upload
+        lite_url = core._pma_pmacoreliteURL
+        core._pma_pmacoreliteURL = server.url
+        try:
+            core.upload_legacy(package["main"], _UPLOAD_DIRECTORY, sessionID)
+        finally:
+            core._pma_pmacoreliteURL = lite_url
+        return server.received
+    return scenario
+
+
+def _upload_large(storage):
+    def scenario(sessionID, server, package, workdir):
+        server.storage = storage
+        (ok, error) = asyncio.run(core.upload_file_over_5gb(pma_core_url=server.url, session_id=sessionID,
+                                                            slide_path=package["main"],
+                                                            upload_directory=_UPLOAD_DIRECTORY))
+        if not ok:
+            raise Exception(error)
+        return server.received
+    return scenario
+
+
+def _download(sessionID, server, package, workdir):
+    slideRef = "Bench/" + package["layout"] + "/" + os.path.basename(package["main"])
+    server.add_slide(slideRef, [("Bench/" + package["layout"] + "/" + relative, path)
+                                for (relative, path) in package["files"]])
+    target = os.path.join(workdir, "download-" + uuid4().hex)
+    os.makedirs(target)
+    try:
+        core.download(slideRef, save_directory=target, sessionID=sessionID)
+        return sum(os.path.getsize(os.path.join(root, f)) for (root, _, files) in os.walk(target) for f in files)
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+
+TRANSFER_SCENARIOS = {
+    "upload_legacy_filesystem": _upload_legacy("filesystem"),
+    "upload_legacy_s3": _upload_legacy("s3"),
+    "upload_legacy_azure": _upload_legacy("azure"),
+    "upload_large_s3": _upload_large("s3"),
+    "upload_large_azure": _upload_large("azure"),
+    "download": _download,
+}
+
+
+def run_transfer_scenario(name, server, package, workdir, quiet=True):
+    """
+    Transfer package (as created by make_package, plus its "layout" and "size") in scenario name through server.
+    Returns a dictionary with the time to complete, the throughput in MB/s, the number of requests the server
+    handled, the bytes that arrived at the other end, and the peak resident set size (MB) during the run.
+    quiet suppresses the progress output of the uploaders
+    """
+    sessionID = "bench-" + uuid4().hex
+    core.register_session_id(sessionID, server.url)
+    server.reset_counters()
+    try:
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull if quiet else sys.stdout), _PeakRSS() as rss:
+            start = time.perf_counter()
+            transferred = TRANSFER_SCENARIOS[name](sessionID, server, package, workdir)
+            seconds = time.perf_counter() - start
+    finally:
+        core.disconnect(sessionID)
+        core.reset_stats(sessionID)
+    return {"scenario": name, "layout": package["layout"], "files": len(package["files"]),
+            "package_gb": package["size"] / 1e9, "seconds": seconds,
+            "mb_per_second": package["size"] / 1e6 / seconds if seconds > 0 else None,
+            "requests": server.requests, "transferred_gb": transferred / 1e9,
+            "peak_rss_mb": None if rss.peak is None else rss.peak / 1e6}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.transfer",
+                                     description="Benchmark pma_python uploads and downloads against local "
+                                                 "stand-ins for PMA.core and S3 / Azure storage")
+    parser.add_argument("--scenarios", nargs="+", choices=list(TRANSFER_SCENARIOS), default=list(TRANSFER_SCENARIOS),
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=list(LAYOUTS),
+                        help="slide package layouts (default: all)")
+    parser.add_argument("--size", type=float, default=2.0, help="size of every slide package in GB")
+    parser.add_argument("--latency", type=float, default=0.0, help="milliseconds added to every request")
+    parser.add_argument("--bandwidth", type=float, default=None, help="MB/s shared by all transfers")
+    parser.add_argument("--part-size", type=float, default=64, help="MB per part of multipart S3 uploads")
+    parser.add_argument("--workdir", help="directory for the (sparse) packages and downloads "
+                                          "(default: a temporary directory); downloads are written in full")
+    parser.add_argument("--verbose", action="store_true", help="show the progress output of the uploaders")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pma_python_transfer_")
+    size = int(args.size * 1e9)
+    results = []
+    try:
+        with TransferStandInServer(latency=args.latency / 1000,
+                                   bandwidth=args.bandwidth * 1e6 if args.bandwidth else None,
+                                   part_size=int(args.part_size * 1024 * 1024)) as server:
+            print("Stand-in transfer server at", server.url, "- packages of %g GB in %s" % (args.size, workdir))
+            print("%-26s %-6s %5s %8s %9s %8s %9s %9s %8s" % ("scenario", "layout", "files", "GB", "seconds",
+                                                              "MB/s", "requests", "moved GB", "RSS MB"))
+            for layout in args.layouts:
+                (main_file, files) = make_package(os.path.join(workdir, layout), layout, size)
+                package = {"layout": layout, "main": main_file, "files": files,
+                           "size": sum(os.path.getsize(path) for (_, path) in files)}
+                for name in args.scenarios:
+                    result = run_transfer_scenario(name, server, package, workdir, quiet=not args.verbose)
+                    results.append(result)
+                    print("%-26s %-6s %5d %8.2f %9.2f %8.1f %9d %9.2f %8s" % (
+                        name, layout, result["files"], result["package_gb"], result["seconds"],
+                        result["mb_per_second"] or 0, result["requests"], result["transferred_gb"],
+                        "-" if result["peak_rss_mb"] is None else "%.1f" % result["peak_rss_mb"]), flush=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+A stand-in for the transfer side of PMA.core and the cloud storage behind it, to benchmark uploads and downloads.
+
+It implements:
+- transfer/Upload (upload headers of both upload_legacy and PmaCoreClient), transfer/Upload/<id> (files posted
+  to PMA.core itself, and upload status), transfer/Upload/CompleteMultipart and transfer/Download
+- api/json/getfilenames and api/json/EnumerateAllFilesForSlide, for the slides registered with add_slide() and
+  for local files (the way PMA.start enumerates them for upload_legacy)
+- presigned S3 PUTs (single-shot, and per part of a multipart upload; every part is answered with an ETag) and
+  Azure block blob PUTs (single-shot, per block and the final block list)
+
+storage selects what upload headers are answered with: 'filesystem' (UploadType 0; files are posted to the
+server), 's3' (UploadType 1; presigned URLs, and multipart uploads for PmaCoreClient files over part_size) or
+'azure' (UploadType 2). Request bodies are read and discarded; received counts the payload bytes.
+Like StandInServer, responses can be delayed by latency and traffic limited to a shared bandwidth
+"""
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+from benchmarks.server import _Throttle
+
+__all__ = ["TransferStandInServer"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    chunk_size = 1024 * 1024
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, content_type="application/json", code=200, headers=None):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """
+        Read (and discard) the request body, plain or chunked; return the number of bytes read
+        """
+        throttle = self.server.stand_in.throttle
+        total = 0
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                remaining = size
+                while remaining > 0:
+                    remaining -= len(self.rfile.read(min(self.chunk_size, remaining)))
+                self.rfile.readline()
+                if throttle is not None:
+                    throttle.consume(size)
+                total += size
+            return total
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(self.chunk_size, remaining))
+            if not chunk:
+                break
+            if throttle is not None:
+                throttle.consume(len(chunk))
+            remaining -= len(chunk)
+            total += len(chunk)
+        return total
+
+    def _route(self):
+        stand_in = self.server.stand_in
+        if stand_in.latency > 0:
+            time.sleep(stand_in.latency)
+        parts = urlsplit(self.path)
+        query = {k.lower(): v[0] for (k, v) in parse_qs(parts.query).items()}
+        segments = [s for s in parts.path.split("/") if s]
+        stand_in.count()
+        return segments, query
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        (segments, query) = self._route()
+        if segments[-1:] == ["getfilenames"]:
+            return self._send([{"Path": path, "Size": os.path.getsize(local), "LastModified": "/Date(0)/"}
+                               for (path, local) in stand_in.slide_files(query.get("pathoruid"))])
+        if segments[-1:] == ["EnumerateAllFilesForSlide"]:
+            return self._send(stand_in.local_files(query.get("pathoruid")))
+        if segments[:2] == ["transfer", "Download"]:
+            return self._download(query)
+        if segments[:2] == ["transfer", "Upload"] and len(segments) == 3:
+            return self._send({"Id": int(segments[2]), "Complete": True, "Success": True})
+        if segments[-1:] == ["DeAuthenticate"]:
+            return self._send(True)
+        return self._send({"Code": 404, "Message": "Not supported by the stand-in server: " + self.path}, code=404)
+
+    def _download(self, query):
+        stand_in = self.server.stand_in
+        files = dict(stand_in.slide_files(query.get("image")))
+        directory = query.get("image", "").rsplit("/", 1)[0]
+        local = files.get(directory + "/" + query.get("path", "").replace("\\", "/"))
+        if local is None:
+            return self._send({"Code": 404, "Message": "File not found"}, code=404)
+        size = os.path.getsize(local)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size))
+        self.send_header("Content-Disposition", "attachment; filename=" + os.path.basename(local))
+        self.end_headers()
+        with open(local, "rb") as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                if stand_in.throttle is not None:
+                    stand_in.throttle.consume(len(chunk))
+                self.wfile.write(chunk)
+        stand_in.add_sent(size)
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        (segments, query) = self._route()
+        if segments == ["transfer", "Upload"]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self._send(stand_in.upload_header(json.loads(self.rfile.read(length) or b"{}")))
+        if segments == ["transfer", "Upload", "CompleteMultipart"]:
+            self._read_body()
+            return self._send(True)
+        if segments[:2] == ["transfer", "Upload"]:
+            stand_in.add_received(self._read_body())
+            return self._send(True)
+        self._read_body()
+        return self._send({"Code": 404, "Message": "Not supported by the stand-in server: " + self.path}, code=404)
+
+    def do_PUT(self):
+        stand_in = self.server.stand_in
+        (segments, query) = self._route()
+        received = self._read_body()
+        if segments[:1] == ["s3"]:
+            stand_in.add_received(received)
+            etag = '"%s-%s"' % (segments[1], query.get("partnumber", "0"))
+            return self._send(b"", "text/plain", headers={"ETag": etag})
+        if segments[:1] == ["azure"]:
+            if query.get("comp") != "blocklist":
+                stand_in.add_received(received)
+            return self._send(b"", "text/plain", code=201)
+        return self._send({"Code": 404, "Message": "Not supported by the stand-in server: " + self.path}, code=404)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class TransferStandInServer:
+    """
+    Stand-in for the PMA.core transfer endpoints and S3 / Azure presigned uploads; see the module docstring.
+    latency is in seconds, bandwidth in bytes per second (None: unlimited), part_size in bytes
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, storage="filesystem", latency=0.0, bandwidth=None,
+                 part_size=64 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.storage = storage
+        self.latency = latency
+        self.throttle = _Throttle(bandwidth) if bandwidth else None
+        self.part_size = part_size
+        self.received = 0
+        self.sent = 0
+        self.requests = 0
+        self._slides = {}
+        self._uploads = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add_slide(self, slideRef, files):
+        """
+        Serve files, a list of (virtual path, local path) pairs, as the files of slideRef (for downloads)
+        """
+        self._slides[slideRef] = list(files)
+
+    def slide_files(self, slideRef):
+        return self._slides.get((slideRef or "").lstrip("/"), [])
+
+    @staticmethod
+    def local_files(slide_path):
+        """
+        The files of a local slide the way PMA.start enumerates them: the slide file, then everything in the
+        directory next to it with the same name
+        """
+        if not os.path.isabs(slide_path):
+            # get_files_for_slide strips the leading / of POSIX paths
+            slide_path = os.sep + slide_path
+        files = []
+        directory = os.path.splitext(slide_path)[0]
+        for (root, _, filenames) in os.walk(directory):
+            files.extend(os.path.join(root, f) for f in sorted(filenames))
+        # upload_legacy takes the last file to be the main file
+        return files + [slide_path]
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def add_received(self, n):
+        with self._lock:
+            self.received += n
+
+    def add_sent(self, n):
+        with self._lock:
+            self.sent += n
+
+    def reset_counters(self):
+        with self._lock:
+            (self.received, self.sent, self.requests) = (0, 0, 0)
+
+    def upload_header(self, header):
+        """
+        Answer an upload header: {"Path", "Files": [{"Path", "Length", "IsMain"}]} (upload_legacy) or
+        {"path", "files": [{"path", "length", "isMain"}]} (PmaCoreClient)
+        """
+        with self._lock:
+            self._uploads += 1
+            upload_id = self._uploads
+        legacy = "Files" in header
+        files = [(f["Path"], f["Length"]) if legacy else (f["path"], f["length"])
+                 for f in header.get("Files", header.get("files", []))]
+        response = {"Id": upload_id, "UploadType": {"filesystem": 0, "s3": 1, "azure": 2}[self.storage],
+                    "Urls": [], "MultipartFiles": []}
+        if self.storage == "filesystem":
+            return response
+        for (path, length) in files:
+            name = quote(path.replace("\\", "/"))
+            if self.storage == "azure":
+                response["Urls"].append("%sazure/%d/%s?sv=2020-10-02&sig=stand-in" % (self.url, upload_id, name))
+            elif legacy or length <= self.part_size:
+                response["Urls"].append("%ss3/%d/%s?X-Amz-Signature=stand-in" % (self.url, upload_id, name))
+            else:
+                parts = []
+                for (number, start) in enumerate(range(0, length, self.part_size), 1):
+                    parts.append({"PartNumber": number, "RangeStart": start,
+                                  "RangeEnd": min(start + self.part_size, length) - 1,
+                                  "Url": "%ss3/%d/%s?partNumber=%d&uploadId=stand-in" % (self.url, upload_id,
+                                                                                         name, number)})
+                response["MultipartFiles"].append({"FilePath": path, "UploadId": "stand-in-%d" % upload_id,
+                                                   "Parts": parts})
+        return response
+
+    @property
+    def url(self):
+        return "http://%s:%d/" % (self.host, self._server.server_address[1])
+
+    def start(self):
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.stand_in = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -4,3 +4,4 @@ from .core import *
 from .core_admin import *
 from .control import *
 from .view import *
+from .sampler import *
@@ -0,0 +1,524 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+class TileCache:
+    """
+    Thread-safe, in-process LRU cache for compressed tiles.
+    The cache holds the bytes as they were received from PMA.core (no decoded images) and evicts the
+    least recently used tiles as soon as the total number of cached bytes exceeds max_bytes
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        if max_bytes is None or max_bytes < 0:
+            raise ValueError("max_bytes must be a non-negative number")
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached bytes for key (marking them as most recently used), or None on a miss
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """
+        Store data under key, evicting least recently used entries to stay within max_bytes.
+        Items that are larger than the whole budget are not cached at all
+        """
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._entries[key] = data
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all cached tiles; the hit/miss/eviction counters are reset as well
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Return a dictionary with the cache counters and its current occupation
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+class SlideInfoCache(MutableMapping):
+    """
+    Thread-safe cache for the slide information (see core.get_slide_info) of one session, keyed by slideRef.
+    At most max_entries slides are kept (least recently used ones are evicted first; None: no limit).
+    Entries older than ttl seconds (None: never) are expired: they are no longer returned by lookup() and
+    don't show up when the cache is used as a mapping, but they are kept for revalidation, which either confirms
+    them (revalidated()) or replaces them. revalidate records how core.get_slide_info revalidates expired entries:
+    None (fetch them again), 'lastmodified' (fetch them again, but keep the cached dictionary when the slide's
+    LastModified date is unchanged) or 'fingerprint' (only fetch them again when the slide's fingerprint changed)
+    """
+
+    revalidate_modes = (None, "lastmodified", "fingerprint")
+
+    def __init__(self, max_entries=10000, ttl=None, revalidate=None):
+        self._entries = OrderedDict()  # slideRef -> [info, stored at, validator]
+        self._lock = threading.Lock()
+        self.configure(max_entries, ttl, revalidate)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, max_entries=10000, ttl=None, revalidate=None):
+        """
+        Change the limits of the cache; entries beyond the new max_entries are evicted right away
+        """
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be a positive number (or None for no limit)")
+        if ttl is not None and ttl < 0:
+            raise ValueError("ttl must be a non-negative number of seconds (or None for no expiry)")
+        if revalidate not in self.revalidate_modes:
+            raise ValueError("revalidate must be None, 'lastmodified' or 'fingerprint'")
+        with self._lock:
+            self.max_entries = None if max_entries is None else int(max_entries)
+            self.ttl = ttl
+            self.revalidate = revalidate
+            self._evict()
+
+    def _evict(self):
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _fresh(self, entry, now):
+        return self.ttl is None or now - entry[1] < self.ttl
+
+    def lookup(self, key):
+        """
+        Return (info, validator, fresh) for key, marking it as most recently used, or None when it isn't cached.
+        Expired entries are returned with fresh set to False, to be revalidated. Counts as a hit or a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if self._fresh(entry, time.monotonic()):
+                self.hits += 1
+                return entry[0], entry[2], True
+            self.misses += 1
+            self.expirations += 1
+            return entry[0], entry[2], False
+
+    def store(self, key, info, validator=None):
+        """
+        Cache info for key, with an optional validator (like the slide's fingerprint) to revalidate it with later
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = [info, time.monotonic(), validator]
+            self._evict()
+
+    def revalidated(self, key, cached, unchanged, info=None, validator=None):
+        """
+        Record the outcome of revalidating cached, the expired information lookup() returned for key: when
+        unchanged, the cached information is kept and its lifetime starts over (it is stored again if the entry was
+        evicted or invalidated in the meantime); otherwise it is replaced by info. Returns the current information
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if unchanged:
+                self.revalidations += 1
+                if entry is not None:
+                    entry[1] = time.monotonic()
+                    if validator is not None:
+                        entry[2] = validator
+                    return entry[0]
+                info = cached
+            else:
+                self.stale += 1
+        if info is not None:
+            self.store(key, info, validator)
+        return info
+
+    def invalidate(self, key=None):
+        """
+        Drop the cached information of key, or of all slides when key is None
+        """
+        with self._lock:
+            if key is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def stats(self):
+        """
+        Return a dictionary with the cache counters and its current occupation
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "revalidations": self.revalidations,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "revalidate": self.revalidate
+            }
+
+    def __getitem__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._fresh(entry, time.monotonic()):
+                raise KeyError(key)
+            return entry[0]
+
+    def __setitem__(self, key, info):
+        self.store(key, info)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._entries[key]
+
+    def _fresh_keys(self):
+        with self._lock:
+            now = time.monotonic()
+            return [key for (key, entry) in self._entries.items() if self._fresh(entry, now)]
+
+    def __iter__(self):
+        return iter(self._fresh_keys())
+
+    def items(self):
+        with self._lock:
+            now = time.monotonic()
+            return [(key, entry[0]) for (key, entry) in self._entries.items() if self._fresh(entry, now)]
+
+    def values(self):
+        return [info for (_, info) in self.items()]
+
+    def __len__(self):
+        return len(self._fresh_keys())
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and self._fresh(entry, time.monotonic())
+
+    def __repr__(self):
+        return "SlideInfoCache(%d entries, max_entries=%r, ttl=%r)" % (len(self._entries), self.max_entries,
+                                                                      self.ttl)
+
+
+class DiskTileCache:
+    """
+    Persistent tile cache, shared by all processes on a machine that point to the same directory.
+
+    Tiles are appended to a single packed data file (tiles.dat) that is read through a memory map;
+    a compact index file (tiles.idx) with fixed-size records maps tile keys to offsets in the data file.
+    Every record carries a version stamp of the slide it belongs to (its LastModified date), so tiles of
+    a slide that has been modified on the server are never returned again and are dropped on compaction.
+
+    Writers serialize through a lock file; readers never block each other. When the data file grows beyond
+    max_bytes, it is compacted: stale tiles are discarded first, then the oldest tiles, until the file is
+    back at 75% of max_bytes
+    """
+
+    _record = struct.Struct("<20s20sqQI")  # key digest, slide digest, slide version stamp, offset, length
+    _digest_size = 20
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024 * 1024):
+        if max_bytes is None or max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number")
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        os.makedirs(path, exist_ok=True)
+        self._data_path = os.path.join(path, "tiles.dat")
+        self._index_path = os.path.join(path, "tiles.idx")
+        self._lock_path = os.path.join(path, "tiles.lock")
+        for p in (self._data_path, self._index_path):
+            if not os.path.exists(p):
+                open(p, "ab").close()
+
+        self._lock = threading.Lock()
+        self._index = {}
+        self._index_id = None
+        self._index_read = 0
+        self._map = None
+        self._map_id = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.compactions = 0
+
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha1(repr(value).encode("utf-8")).digest()
+
+    @staticmethod
+    def _file_id(path):
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino)
+
+    def _refresh_index(self):
+        """
+        Pick up records appended by other processes (or a new index after compaction)
+        """
+        file_id = self._file_id(self._index_path)
+        if file_id != self._index_id:
+            self._index = {}
+            self._index_id = file_id
+            self._index_read = 0
+        size = os.path.getsize(self._index_path)
+        if size - self._index_read < self._record.size:
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_read)
+            buf = f.read(size - self._index_read)
+        usable = len(buf) - (len(buf) % self._record.size)
+        for (key_digest, slide_digest, stamp, offset, length) in self._record.iter_unpack(buf[:usable]):
+            self._index[key_digest] = (slide_digest, stamp, offset, length)
+        self._index_read += usable
+
+    def _read(self, offset, length):
+        """
+        Read a payload through the memory map, re-mapping when the data file was replaced or has grown
+        """
+        end = offset + self._digest_size + length
+        file_id = self._file_id(self._data_path)
+        if self._map is None or file_id != self._map_id or end > len(self._map):
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if os.path.getsize(self._data_path) < end:
+                return None
+            with open(self._data_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_id = file_id
+        return self._map[offset:end]
+
+    def get(self, key, stamp=0):
+        """
+        Return the cached bytes for key, provided they were stored for the same version (stamp) of the slide
+        """
+        key_digest = self._digest(key)
+        with self._lock:
+            entry = self._index.get(key_digest)
+            if entry is None:
+                self._refresh_index()
+                entry = self._index.get(key_digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            (_, entry_stamp, offset, length) = entry
+            if entry_stamp != stamp:
+                self.stale += 1
+                self.misses += 1
+                return None
+            raw = self._read(offset, length)
+            if raw is None or raw[:self._digest_size] != key_digest:
+                # the index and data file were swapped under us by a compaction in another process
+                self._index_id = None
+                self.misses += 1
+                return None
+            self.hits += 1
+            return raw[self._digest_size:]
+
+    def put(self, key, slide_key, stamp, data):
+        """
+        Append data to the cache for key and the given version (stamp) of the slide
+        """
+        key_digest = self._digest(key)
+        slide_digest = self._digest(slide_key)
+        with self._lock, _FileLock(self._lock_path):
+            with open(self._data_path, "ab") as f:
+                offset = f.tell()
+                f.write(key_digest)
+                f.write(data)
+                end = f.tell()
+            with open(self._index_path, "ab") as f:
+                f.write(self._record.pack(key_digest, slide_digest, int(stamp), offset, len(data)))
+            if end > self.max_bytes:
+                self._compact()
+
+    def _compact(self):
+        """
+        Rewrite the data and index files, keeping only current tiles and dropping the oldest ones
+        until the data file is back at 75% of max_bytes. Caller must hold both locks
+        """
+        self._index_id = None
+        self._refresh_index()
+
+        latest = {}
+        for (slide_digest, stamp, _, _) in self._index.values():
+            latest[slide_digest] = max(stamp, latest.get(slide_digest, stamp))
+        live = [(offset, key_digest, slide_digest, stamp, length)
+                for (key_digest, (slide_digest, stamp, offset, length)) in self._index.items()
+                if latest[slide_digest] == stamp]
+        live.sort(reverse=True)  # most recently appended first
+
+        budget = int(self.max_bytes * 0.75)
+        keep = []
+        total = 0
+        for entry in live:
+            size = self._digest_size + entry[4]
+            if total + size > budget:
+                break
+            keep.append(entry)
+            total += size
+        keep.reverse()
+
+        tmp_data = self._data_path + ".tmp"
+        tmp_index = self._index_path + ".tmp"
+        with open(self._data_path, "rb") as src, open(tmp_data, "wb") as dst_data, open(tmp_index, "wb") as dst_index:
+            for (offset, key_digest, slide_digest, stamp, length) in keep:
+                src.seek(offset)
+                raw = src.read(self._digest_size + length)
+                new_offset = dst_data.tell()
+                dst_data.write(raw)
+                dst_index.write(self._record.pack(key_digest, slide_digest, stamp, new_offset, length))
+        # replace the data file first; readers validate the key digest stored in front of every payload
+        os.replace(tmp_data, self._data_path)
+        os.replace(tmp_index, self._index_path)
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._index_id = None
+        self._refresh_index()
+        self.compactions += 1
+
+    def clear(self):
+        """
+        Remove all cached tiles from disk and reset the counters
+        """
+        with self._lock, _FileLock(self._lock_path):
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            for p in (self._data_path, self._index_path):
+                open(p + ".tmp", "wb").close()
+                os.replace(p + ".tmp", p)
+            self._index = {}
+            self._index_id = None
+            self._index_read = 0
+            self.hits = 0
+            self.misses = 0
+            self.stale = 0
+            self.compactions = 0
+
+    def close(self):
+        """
+        Release the memory map held by this process
+        """
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+    def stats(self):
+        """
+        Return a dictionary with the cache counters and the size of the data file
+        """
+        with self._lock:
+            self._refresh_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "compactions": self.compactions,
+                "entries": len(self._index),
+                "bytes": os.path.getsize(self._data_path),
+                "max_bytes": self.max_bytes
+            }
+
+
+class _FileLock:
+    """
+    Exclusive inter-process lock on a file (fcntl on POSIX, msvcrt on Windows)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
@@ -1,6 +1,4 @@
 import os
-import urllib.error
-from urllib import request, parse
 from pma_python import core, pma
 
 import requests
@@ -55,7 +53,7 @@ def _pma_get_training_sessions(pmacontrolURL, pmacoreSessionID):
         pmacontrolURL, "api/Sessions?sessionID=" + pma._pma_q(pmacoreSessionID))
     try:
         headers = {'Accept': 'application/json'}
-        r = pma._pma_http_get(url, headers)
+        r = pma._pma_http_get(url, headers, sessionID=pmacoreSessionID)
     except Exception as e:
         print(e)
         return None
@@ -107,7 +105,7 @@ def get_training_session_participants(pmacontrolURL, pmacontrolTrainingSessionID
         "api/Sessions/" + str(pmacontrolTrainingSessionID) + "/Participants?sessionID=" + pma._pma_q(pmacoreSessionID))
     try:
         headers = {'Accept': 'application/json'}
-        r = pma._pma_http_get(url, headers)
+        r = pma._pma_http_get(url, headers, sessionID=pmacoreSessionID)
     except Exception as e:
         print(e)
         return None
@@ -176,12 +174,11 @@ def register_participant_for_training_session(pmacontrolURL,
         "Role": pmacontrolRole,
         "InteractionMode": pmacontrolInteractionMode
     }  # default interaction mode = Locked
-    data = parse.urlencode(data).encode()
     if (pma._pma_debug is True):
         print("Posting to", url)
         print("   with payload", data)
-    req = request.Request(url=url, data=data)  # this makes the method "POST"
-    resp = request.urlopen(req)
+    resp = pma._pma_http_request("POST", url, pmacoreSessionID, data=data)  # form-encoded, like before
+    resp.raise_for_status()
     pma._pma_clear_url_cache()
     return resp
 
@@ -202,12 +199,11 @@ def register_participant_for_project(pmacontrolURL,
         "Role": pmacontrolRole,
         "InteractionMode": pmacontrolInteractionMode
     }  # default interaction mode = Locked
-    data = parse.urlencode(data).encode()
     if (pma._pma_debug is True):
         print("Posting to", url)
         print("   with payload", data)
-    req = request.Request(url=url, data=data)  # this makes the method "POST"
-    resp = request.urlopen(req)
+    resp = pma._pma_http_request("POST", url, pmacoreSessionID, data=data)  # form-encoded, like before
+    resp.raise_for_status()
     pma._pma_clear_url_cache()
     return resp
 
@@ -242,19 +238,18 @@ def set_participant_interactionmode(pmacontrolURL, participantUsername, pmacontr
         "CaseCollectionId": pmacontrolCaseCollectionID,
         "InteractionMode": pmacontrolInteractionMode
     }
-    data = parse.urlencode(data).encode()
     if (pma._pma_debug is True):
         print("Posting to", url)
         print("   with payload", data)
-    req = request.Request(url=url, data=data)  # this makes the method "POST"
     try:
-        resp = request.urlopen(req)
-    except urllib.error.HTTPError as e:
+        resp = pma._pma_http_request("POST", url, pmacoreSessionID, data=data)  # form-encoded, like before
+        resp.raise_for_status()
+    except requests.exceptions.HTTPError as e:
         if (pma._pma_debug is True):
             print("HTTP ERROR")
             print(e.__dict__)
         return None
-    except urllib.error.URLError as e:
+    except requests.exceptions.RequestException as e:
         if (pma._pma_debug is True):
             print("URL ERROR")
             print(e.__dict__)
@@ -342,7 +337,7 @@ def _pma_get_case_collections(pmacontrolURL, pmacoreSessionID):
         pmacontrolURL, "api/CaseCollections?sessionID=" + pma._pma_q(pmacoreSessionID))
     try:
         headers = {'Accept': 'application/json'}
-        r = pma._pma_http_get(url, headers)
+        r = pma._pma_http_get(url, headers, sessionID=pmacoreSessionID)
         return r.json()
     except Exception as e:
         return None
@@ -438,7 +433,7 @@ def _pma_get_projects(pmacontrolURL, pmacoreSessionID):
         pmacontrolURL, "api/Projects?sessionID=" + pma._pma_q(pmacoreSessionID))
     try:
         headers = {'Accept': 'application/json'}
-        r = pma._pma_http_get(url, headers)
+        r = pma._pma_http_get(url, headers, sessionID=pmacoreSessionID)
         return r.json()
     except Exception as e:
         return None
@@ -1,24 +1,38 @@
 from __future__ import annotations
 
 import asyncio
-from math import ceil
+import contextlib
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from math import ceil, log2
 from pprint import pprint
 from PIL import Image
 from random import choice
 from io import BytesIO
-from urllib.request import urlopen
 from pma_python import pma
 
 # general purpose packages
 import os
 import datetime
 import io
+import json as jsonlib
+import multiprocessing
 import re
+import struct
+import threading
+import time
+import traceback
+import zlib
+from urllib.parse import urlsplit
+import numpy as np
 import pandas as pd
 import requests
 from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
 
 from .pma_core_client import PmaCoreClient, UploadHeaderModel, UploadFileModel, UploadResponse
+from .cache import TileCache, DiskTileCache, SlideInfoCache
 from typing import Callable
 
 ProgressCallback = Callable[[int, int], None]
@@ -44,11 +58,16 @@ pma_annotation_target_format_csv = 4
 # internal module helper variables and functions
 _pma_sessions = dict()
 _pma_usernames = dict()
-_pma_slideinfos = dict()
+_pma_slideinfos = dict()  # a SlideInfoCache per session
+_pma_slideinfo_cache_settings = {"max_entries": 10000, "ttl": None, "revalidate": None}  # see set_slide_info_cache()
 _pma_pmacoreliteURL = "http://localhost:54001/"
 _pma_pmacoreliteSessionID = "SDK.Python"
 _pma_usecachewhenretrievingtiles = True
-_pma_amount_of_data_downloaded = {_pma_pmacoreliteSessionID: 0}
+_pma_tile_cache = None  # optional client-side TileCache; see enable_tile_cache()
+_pma_trace = None  # timeline being recorded; see start_trace()
+_pma_disk_tile_cache = None  # optional persistent DiskTileCache; see enable_disk_tile_cache()
+_pma_in_flight = dict()  # requests currently being fetched, shared by identical concurrent callers; see _pma_coalesce()
+_pma_in_flight_lock = threading.Lock()
 
 
 def set_debug_flag(flag):
@@ -59,6 +78,44 @@ def set_debug_flag(flag):
     pma._pma_set_debug_flag(flag)
 
 
+def _pma_coalesce(key, fetch):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Single-flight: the first caller for a key runs fetch(); callers that ask for the same key while that fetch is
+    still in progress wait for it and receive the same result (or exception) instead of sending their own request.
+    A timeout of the first caller (e.g. its own deadline) is not passed on: the callers still waiting try again,
+    one of them sending the request anew
+    """
+    while True:
+        with _pma_in_flight_lock:
+            future = _pma_in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                _pma_in_flight[key] = future
+        if leader:
+            break
+        try:
+            return future.result(timeout=pma._pma_remaining_time())
+        except FutureTimeoutError:
+            raise requests.exceptions.Timeout("Deadline exceeded")
+        except requests.exceptions.Timeout:
+            continue
+
+    try:
+        result = fetch()
+    except BaseException as e:
+        with _pma_in_flight_lock:
+            del _pma_in_flight[key]
+        future.set_exception(e)
+        raise
+    with _pma_in_flight_lock:
+        del _pma_in_flight[key]
+    future.set_result(result)
+    return result
+
+
 def _pma_session_id(sessionID=None):
     """
     Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
@@ -72,6 +129,13 @@ def _pma_session_id(sessionID=None):
         return sessionID
 
 
+def _pma_new_slideinfo_cache():
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    return SlideInfoCache(**_pma_slideinfo_cache_settings)
+
+
 def _pma_first_session_id():
     """
     Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
@@ -92,9 +156,7 @@ def _pma_first_session_id():
         if (_pma_is_lite()):
             if (_pma_pmacoreliteSessionID not in _pma_slideinfos):
                 # _pma_sessions[_pma_pmacoreliteSessionID] = _pma_pmacoreliteURL
-                _pma_slideinfos[_pma_pmacoreliteSessionID] = dict()
-            if (_pma_pmacoreliteSessionID not in _pma_amount_of_data_downloaded):
-                _pma_amount_of_data_downloaded[_pma_pmacoreliteSessionID] = 0
+                _pma_slideinfos[_pma_pmacoreliteSessionID] = _pma_new_slideinfo_cache()
             if pma._pma_debug == True:
                 print("Found PMA.start SessionID:", _pma_pmacoreliteSessionID)
             return _pma_pmacoreliteSessionID
@@ -142,7 +204,7 @@ def _pma_is_lite(pmacoreURL=_pma_pmacoreliteURL, verify=True):
 
     url = pma._pma_join(pmacoreURL, "api/json/IsLite")
     try:
-        r = requests.get(url, verify=verify)
+        r = pma._pma_http_request("GET", url, verify=verify, retries=0, breaker=False)
         print("PMA.start detected successfully")
     except Exception as e:
         # this happens when NO instance of PMA.core.lite is detected
@@ -210,7 +272,7 @@ def get_version_info(pmacoreURL=_pma_pmacoreliteURL, verify=True):
         print(url)
 
     try:
-        r = requests.get(url, verify=verify)
+        r = pma._pma_http_request("GET", url, verify=verify, retries=0, breaker=False)
     except Exception:
         return None
 
@@ -241,7 +303,7 @@ def get_build_revision(pmacoreURL=_pma_pmacoreliteURL, verify=True):
         print(url)
 
     try:
-        r = requests.get(url, verify=verify)
+        r = pma._pma_http_request("GET", url, verify=verify, retries=0, breaker=False)
     except Exception:
         return None
 
@@ -265,7 +327,7 @@ def get_api_version(pmacoreURL=_pma_pmacoreliteURL, verify=True):
         print(url)
 
     try:
-        r = requests.get(url, verify=verify)
+        r = pma._pma_http_request("GET", url, verify=verify, retries=0, breaker=False)
     except Exception:
         return None
 
@@ -298,13 +360,55 @@ def register_session_id(session_id, pma_core_url):
     Registers a session ID with it's corresponding server URL
     """
     global _pma_sessions  # so afterwards we can look up what username actually belongs to a sessions
-    global _pma_amount_of_data_downloaded
     global _pma_slideinfos
-    _pma_amount_of_data_downloaded[session_id] = 0
     _pma_sessions[session_id] = pma_core_url
-    _pma_slideinfos[session_id] = {}
+    _pma_slideinfos[session_id] = _pma_new_slideinfo_cache()
+    pma._pma_http_session(session_id)
+
+
+def _pma_session_context(sessionID=None, slideRefs=None):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Capture what another process needs to continue working with sessionID: the server URL, the transport settings
+    and the slide information that was already retrieved (for slideRefs only, when given). The result is picklable
+    """
+    sessionID = _pma_session_id(sessionID)
+    infos = _pma_slideinfos.get(sessionID, {})
+    if slideRefs is not None:
+        slideRefs = [s[1:] if s.startswith("/") else s for s in slideRefs]
+        infos = {s: infos[s] for s in slideRefs if s in infos}
+    return {
+        "sessionID": sessionID,
+        "url": _pma_sessions.get(sessionID),
+        "username": _pma_usernames.get(sessionID),
+        "slideinfos": dict(infos),
+        "timeout": pma._pma_timeout,
+        "retry_policy": dict(pma._pma_retry_policy),
+    }
+
+
+def _pma_restore_session_context(context):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Counterpart of _pma_session_context(), to be called in a worker process. Every worker ends up with
+    its own pooled HTTP session; restoring into the process the context came from is harmless
+    """
+    sessionID = context["sessionID"]
+    if context["url"] is not None and sessionID not in _pma_sessions:
+        register_session_id(sessionID, context["url"])
+        if context["username"] is not None:
+            _pma_usernames[sessionID] = context["username"]
+    if sessionID not in _pma_slideinfos:
+        _pma_slideinfos[sessionID] = _pma_new_slideinfo_cache()
+    _pma_slideinfos[sessionID].update(context["slideinfos"])
+    pma._pma_timeout = context["timeout"]
+    pma._pma_retry_policy = context["retry_policy"]
+    return sessionID
 
 
+@pma._pma_traced
 def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword="", verify=True):
     """
     Attempt to connect to PMA.core instance; success results in a SessionID
@@ -312,10 +416,8 @@ def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword=
     global _pma_sessions  # so afterwards we can look up what username actually belongs to a sessions
     # so afterwards we can determine the PMA.core URL to connect to for a given SessionID
     global _pma_usernames
-    # a caching mechanism for slide information; obsolete and should be improved
+    # a caching mechanism for slide information; see set_slide_info_cache()
     global _pma_slideinfos
-    # keep track of how much data was downloaded
-    global _pma_amount_of_data_downloaded
 
     url = ""
 
@@ -325,8 +427,8 @@ def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword=
             sessionID = _pma_pmacoreliteSessionID
             _pma_sessions[sessionID] = pmacoreURL
             if not (sessionID in _pma_slideinfos):
-                _pma_slideinfos[sessionID] = {}
-            _pma_amount_of_data_downloaded[sessionID] = 0
+                _pma_slideinfos[sessionID] = _pma_new_slideinfo_cache()
+            pma._pma_http_session(sessionID)
             return sessionID
         else:
             if pma._pma_debug == True:
@@ -348,9 +450,9 @@ def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword=
               pma._pma_q(pmacoreUsername) + "&password=TOP_SECRET")
 
     try:
-        r = requests.post(post_url, headers=headers, json={
+        r = pma._pma_http_request("POST", post_url, headers=headers, json={
             "username": pmacoreUsername, "password": pmacorePassword, "caller": "SDK.Python"},
-                          verify=verify)
+                                  verify=verify)
         if (r.status_code != 200):
             raise Exception("not supported")
     except Exception as e:
@@ -363,7 +465,7 @@ def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword=
             url += "&password=" + pma._pma_q(pmacorePassword)
 
         try:
-            r = requests.get(url, headers=headers, verify=verify)
+            r = pma._pma_http_request("GET", url, headers=headers, verify=verify)
         except Exception as e:
             print(e)
             return None
@@ -378,8 +480,8 @@ def connect(pmacoreURL=_pma_pmacoreliteURL, pmacoreUsername="", pmacorePassword=
         _pma_usernames[sessionID] = pmacoreUsername
         _pma_sessions[sessionID] = pmacoreURL
         if not (sessionID in _pma_slideinfos):
-            _pma_slideinfos[sessionID] = {}
-        _pma_amount_of_data_downloaded[sessionID] = len(loginresult)
+            _pma_slideinfos[sessionID] = _pma_new_slideinfo_cache()
+        pma._pma_http_session(sessionID)
 
     return sessionID
 
@@ -393,17 +495,123 @@ def disconnect(sessionID=None):
           "DeAuthenticate?sessionID=" + pma._pma_q((sessionID))
     if pma._pma_debug == True:
         print(url)
-    contents = urlopen(url).read()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(contents)
+    pma._pma_http_request("GET", url, sessionID)
     if (len(_pma_sessions.keys()) > 0):
         # yes we do! This means that when there's a PMA.core active session AND PMA.core.lite version running,
         # the PMA.core active will be selected and returned
         del _pma_sessions[sessionID]
         del _pma_slideinfos[sessionID]
+    pma._pma_close_http_session(sessionID)
     return True
 
 
+def set_http_pool_size(size):
+    """
+    Set the maximum number of connections that are kept alive (per PMA.core instance) for every session.
+    Raise this when fetching tiles with many concurrent workers; connections beyond the pool size are not re-used
+    """
+    pma._pma_set_http_pool_size(size)
+
+
+def set_retry_policy(retries=3, backoff=0.5, max_backoff=30.0, status_forcelist=(429, 500, 502, 503, 504),
+                     breaker_threshold=10, breaker_cooldown=30.0):
+    """
+    Configure how idempotent requests to PMA.core (GET, HEAD, OPTIONS) survive transient faults.
+    Dropped connections, timeouts and responses with a status code in status_forcelist are retried at most retries
+    times, with exponential backoff and jitter (backoff * 2 ** attempt seconds at most, capped at max_backoff),
+    or after the delay the server asks for through a Retry-After header.
+    After breaker_threshold consecutive failures against a server, requests to it fail immediately for
+    breaker_cooldown seconds (circuit breaker), rather than piling up on an instance that is down.
+    Set retries to 0 to disable retrying, breaker_threshold to 0 to disable the circuit breaker
+    """
+    pma._pma_set_retry_policy(retries, backoff, max_backoff, status_forcelist, breaker_threshold, breaker_cooldown)
+
+
+def get_stats(sessionID=None):
+    """
+    Return statistics about all requests made to PMA.core so far, per session and per endpoint
+    ('tile', 'region', 'GetImageInfo', 'GetFiles', 'upload', 'download', ...):
+    {sessionID: {endpoint: {...}, ..., "total": {...}}}, or only {endpoint: {...}, ..., "total": {...}}
+    for sessionID when one is given. Every entry holds the number of requests (retries included) and errors,
+    the bytes received and sent, and the request latency in seconds: mean, p50, p95, p99 and max.
+    Requests made before a session existed (like authenticating) are listed under sessionID None
+    """
+    stats = pma._pma_get_stats()
+    if sessionID is not None:
+        return stats.get(sessionID, {})
+    return stats
+
+
+def reset_stats(sessionID=None):
+    """
+    Reset the statistics returned by get_stats, for all sessions or only for sessionID
+    """
+    pma._pma_reset_stats(sessionID, all_sessions=sessionID is None)
+
+
+def set_timeout(timeout=(10, 300)):
+    """
+    Set the default timeout for every request to PMA.core: a number of seconds, a (connect, read) tuple,
+    or None to wait forever. Functions that take a timeout argument use that one instead
+    """
+    pma._pma_set_timeout(timeout)
+
+
+def deadline(seconds):
+    """
+    Context manager that gives everything inside it a total time budget of seconds, e.g.
+        with core.deadline(30):
+            for tile in core.get_tiles(slide, workers=8): ...
+    Every request made within the block (including those made by worker threads) gets at most the time that is
+    left; once the budget runs out, requests.exceptions.Timeout is raised and outstanding work is cancelled.
+    Nested deadlines can only shorten the budget
+    """
+    return pma._pma_deadline_scope(seconds)
+
+
+def add_hook(hook):
+    """
+    Register a callable that is called with an event dictionary whenever a request to PMA.core or a call of a
+    public function of pma_python starts or ends, and on tile cache lookups. Events carry the kind ('http',
+    'call' or 'cache'), the name (endpoint or function), the session, a timestamp and thread; end events add the
+    duration, error and, for requests, the URL (without query string), status code and bytes transferred.
+    See start_trace for a ready-made hook
+    """
+    pma._pma_add_hook(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregister a hook that was registered with add_hook
+    """
+    pma._pma_remove_hook(hook)
+
+
+def start_trace():
+    """
+    Start recording all requests and API calls into a timeline; write it with stop_trace
+    """
+    global _pma_trace
+    if _pma_trace is not None:
+        pma._pma_remove_hook(_pma_trace)
+    _pma_trace = pma._PmaChromeTrace()
+    pma._pma_add_hook(_pma_trace)
+
+
+def stop_trace(path):
+    """
+    Stop recording and write the timeline to path, in the Chrome trace event format; open it in Perfetto
+    (https://ui.perfetto.dev) or chrome://tracing. Returns path
+    """
+    global _pma_trace
+    if _pma_trace is None:
+        raise Exception("No trace is being recorded; call start_trace first")
+    pma._pma_remove_hook(_pma_trace)
+    (trace, _pma_trace) = (_pma_trace, None)
+    return trace.write(path)
+
+
+@pma._pma_traced
 def get_root_directories(sessionID=None, verify=True):
     """
     Return an array of root-directories available to sessionID
@@ -414,10 +622,8 @@ def get_root_directories(sessionID=None, verify=True):
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception(
             "get_root_directories failed with error " + json["Message"])
@@ -474,6 +680,7 @@ def analyse_corresponding_root_directories(sessionIDs):
     return df
 
 
+@pma._pma_traced
 def get_directories(startDir, sessionID=None, recursive=False, verify=True):
     """
     Return an array of sub-directories available to sessionID in the startDir directory
@@ -483,10 +690,8 @@ def get_directories(startDir, sessionID=None, recursive=False, verify=True):
           pma._pma_q(sessionID) + "&path=" + pma._pma_q(startDir)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("get_directories to " + startDir +
                         " resulted in: " + json["Message"])
@@ -550,6 +755,7 @@ def get_first_non_empty_directory(startDir=None, sessionID=None):
     return None
 
 
+@pma._pma_traced
 def get_slides(startDir, sessionID=None, recursive=False, verify=True):
     """
     Return an array of slides available to sessionID in the startDir directory
@@ -572,10 +778,8 @@ def get_slides(startDir, sessionID=None, recursive=False, verify=True):
           pma._pma_q(sessionID) + "&path=" + pma._pma_q(startDir)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("get_slides from " + startDir +
                         " resulted in: " + json["Message"])
@@ -671,10 +875,8 @@ def get_uid(slideRef, sessionID=None, verify=True):
           pma._pma_q(sessionID) + "&path=" + pma._pma_q(slideRef)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("get_uid on  " + slideRef +
                         " resulted in: " + json["Message"])
@@ -691,10 +893,8 @@ def get_fingerprint(slideRef, sessionID=None, verify=True):
     url = _pma_api_url(sessionID) + "GetFingerprint?sessionID=" + \
           pma._pma_q(sessionID) + "&pathOrUid=" + pma._pma_q(slideRef)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("get_fingerprint on  " + slideRef +
                         " resulted in: " + json["Message"])
@@ -715,14 +915,14 @@ def who_am_i(sessionID=None):
             "sessionID": _pma_pmacoreliteSessionID,
             "username": None,
             "url": _pma_pmacoreliteURL,
-            "amountOfDataDownloaded": _pma_amount_of_data_downloaded[_pma_pmacoreliteSessionID]
+            "amountOfDataDownloaded": pma._pma_bytes_received(_pma_pmacoreliteSessionID)
         }
     elif (sessionID is not None):
         retval = {
             "sessionID": sessionID,
             "username": _pma_usernames[sessionID],
             "url": _pma_url(sessionID),
-            "amountOfDataDownloaded": _pma_amount_of_data_downloaded[sessionID]
+            "amountOfDataDownloaded": pma._pma_bytes_received(sessionID)
         }
 
     return retval
@@ -754,6 +954,46 @@ def get_tile_size(sessionID=None):
     return (int(info["TileSize"]), int(info["TileSize"]))
 
 
+def _pma_slide_info_steps(cache, slideRef, entry):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Decide how to (re)fill cache for slideRef, given entry as returned by cache.lookup() (None, or expired
+    information), independently of how requests are made: a generator that yields "fingerprint" or "info" for
+    every request it needs, expects the response to be sent back and returns the slide information.
+    Drive it with _pma_run_slide_info_steps() or the asynchronous equivalent in get_slide_info_async()
+    """
+    fingerprint = None
+    if cache.revalidate == "fingerprint":
+        # taken before the information, so that a change in between shows up as a different fingerprint later
+        fingerprint = yield "fingerprint"
+        if entry is not None and fingerprint == entry[1]:
+            return cache.revalidated(slideRef, entry[0], True, validator=fingerprint)
+    info = yield "info"
+    if entry is None:
+        cache.store(slideRef, info, fingerprint)
+        return info
+    # the cached information has expired: keep it when the slide didn't change in the meantime
+    unchanged = cache.revalidate == "lastmodified" and info.get("LastModified") == entry[0].get("LastModified")
+    return cache.revalidated(slideRef, entry[0], unchanged, info, fingerprint)
+
+
+def _pma_run_slide_info_steps(steps, handlers):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Run the generator of _pma_slide_info_steps(), making every request it asks for through handlers, a
+    dictionary of functions ("fingerprint", "info") without arguments
+    """
+    try:
+        need = next(steps)
+        while True:
+            need = steps.send(handlers[need]())
+    except StopIteration as done:
+        return done.value
+
+
+@pma._pma_traced
 def get_slide_info(slideRef, sessionID=None, verify=True):
     """
     Return raw image information in the form of nested dictionaries
@@ -762,31 +1002,80 @@ def get_slide_info(slideRef, sessionID=None, verify=True):
     if (slideRef.startswith("/")):
         slideRef = slideRef[1:]
 
-    global _pma_slideinfos
+    cache = _pma_slideinfos[sessionID]
 
-    if (not (slideRef in _pma_slideinfos[sessionID])):
+    def request():
         url = _pma_api_url(sessionID) + "GetImageInfo?SessionID=" + \
               pma._pma_q(sessionID) + "&pathOrUid=" + pma._pma_q(slideRef)
         if pma._pma_debug == True:
             print(url)
-        r = requests.get(url, verify=verify)
+        r = pma._pma_http_request("GET", url, sessionID, verify=verify)
         if r.status_code != 200:
             raise Exception("ImageInfo to " + slideRef + " error")
 
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json or 'Message' in json):
             raise Exception("ImageInfo to " + slideRef +
                             " resulted in: " + json["Message"])
         elif ("d" in json):
-            _pma_slideinfos[sessionID][slideRef] = json["d"]
-        else:
-            _pma_slideinfos[sessionID][slideRef] = json
-    elif pma._pma_debug == True:
-        print("Getting slide info from cache")
+            return json["d"]
+        return json
+
+    def fetch():
+        return _pma_run_slide_info_steps(_pma_slide_info_steps(cache, slideRef, entry), {
+            "fingerprint": lambda: get_fingerprint(slideRef, sessionID, verify),
+            "info": request})
+
+    entry = cache.lookup(slideRef)
+    if entry is not None and entry[2]:
+        if pma._pma_debug == True:
+            print("Getting slide info from cache")
+        return entry[0]
+    return _pma_coalesce(("GetImageInfo", sessionID, slideRef), fetch)
+
+
+def set_slide_info_cache(max_entries=10000, ttl=None, revalidate=None):
+    """
+    Configure the cache of slide information (see get_slide_info) that every session keeps, and that all
+    functions that need the dimensions, zoomlevels or resolution of a slide rely on.
+    At most max_entries slides are cached per session (least recently used ones are dropped first; None: no
+    limit). After ttl seconds (None: never), cached information expires and is revalidated when it is needed
+    again, according to revalidate:
+    None: fetch the information again
+    'lastmodified': fetch the information again, but keep using the cached dictionary when the LastModified
+        date of the slide didn't change
+    'fingerprint': ask PMA.core for the fingerprint of the slide (see get_fingerprint), and only fetch the
+        information again when that changed; this is cheaper for slides with a lot of metadata
+    Applies to the caches of existing sessions as well
+    """
+    global _pma_slideinfo_cache_settings
+    SlideInfoCache(max_entries, ttl, revalidate)  # validates the arguments
+    _pma_slideinfo_cache_settings = {"max_entries": max_entries, "ttl": ttl, "revalidate": revalidate}
+    for cache in list(_pma_slideinfos.values()):
+        cache.configure(max_entries, ttl, revalidate)
+
+
+def invalidate_slide_info(slideRef=None, sessionID=None):
+    """
+    Drop the cached information of slideRef (or of all slides when slideRef is None) for sessionID,
+    e.g. after the slide was rescanned or replaced; the next get_slide_info retrieves it again
+    """
+    sessionID = _pma_session_id(sessionID)
+    if slideRef is not None and slideRef.startswith("/"):
+        slideRef = slideRef[1:]
+    if sessionID in _pma_slideinfos:
+        _pma_slideinfos[sessionID].invalidate(slideRef)
 
-    return _pma_slideinfos[sessionID][slideRef]
+
+def get_slide_info_cache_stats(sessionID=None):
+    """
+    Return hits, misses, expired entries, revalidations (the cached information was still valid), stale entries
+    (it was not), evictions, invalidations and the number of entries of the slide information cache of sessionID
+    """
+    sessionID = _pma_session_id(sessionID)
+    if sessionID not in _pma_slideinfos:
+        return None
+    return _pma_slideinfos[sessionID].stats()
 
 
 def get_max_zoomlevel(slideRef, sessionID=None):
@@ -873,7 +1162,7 @@ def get_pixel_dimensions(slideRef, sessionID=None, zoomlevel=None):
 
 def get_number_of_tiles(slideRef, zoomlevel=None, sessionID=None):
     """Determine the number of tiles needed to reconstitute a slide at a given zoomlevel"""
-    pixels = get_pixel_dimensions(slideRef, zoomlevel, sessionID)
+    pixels = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
     sz = get_tile_size(sessionID)
     xtiles = int(ceil(pixels[0] / sz[0]))
     ytiles = int(ceil(pixels[1] / sz[0]))
@@ -955,18 +1244,17 @@ def get_barcode_url(slideRef, width=None, height=None, sessionID=None):
     return url
 
 
+@pma._pma_traced
 def get_barcode_image(slideRef, width=None, height=None, sessionID=None, verify=True):
     """Get the barcode (alias for "label") image for a slide"""
     sessionID = _pma_session_id(sessionID)
     if (slideRef.startswith("/")):
         slideRef = slideRef[1:]
     url = get_barcode_url(slideRef, width, height, sessionID)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if pma._pma_debug == True:
         print(url)
     img = Image.open(BytesIO(r.content))
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(r.content)
     return img
 
 
@@ -979,11 +1267,9 @@ def get_barcode_text(slideRef, sessionID=None, verify=True):
           pma._pma_q(sessionID) + "&pathOrUid=" + pma._pma_q(slideRef)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_barcode_text on  " + slideRef +
                             " resulted in: " + json["Message"])
@@ -999,6 +1285,7 @@ def get_label_url(slideRef, width=None, height=None, sessionID=None):
     return get_barcode_url(slideRef, width, height, sessionID)
 
 
+@pma._pma_traced
 def get_label_image(slideRef, width=None, height=None, sessionID=None):
     """Get the label image for a slide"""
     return get_barcode_image(slideRef, width, height, sessionID)
@@ -1018,6 +1305,7 @@ def get_thumbnail_url(slideRef, width=None, height=None, sessionID=None):
     return url
 
 
+@pma._pma_traced
 def get_thumbnail_image(slideRef, width=None, height=None, sessionID=None, verify=True):
     """Get the thumbnail image for a slide"""
     sessionID = _pma_session_id(sessionID)
@@ -1026,10 +1314,13 @@ def get_thumbnail_image(slideRef, width=None, height=None, sessionID=None, verif
     url = get_thumbnail_url(slideRef, width, height, sessionID)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
-    img = Image.open(BytesIO(r.content))
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(r.content)
+
+    def fetch():
+        r = pma._pma_http_request("GET", url, sessionID, verify=verify)
+        return r.content
+
+    # callers share the downloaded bytes, but every caller gets its own image object
+    img = Image.open(BytesIO(_pma_coalesce(("thumbnail", url), fetch)))
     return img
 
 
@@ -1047,6 +1338,7 @@ def get_macro_url(slideRef, width=None, height=None, sessionID=None):
     return url
 
 
+@pma._pma_traced
 def get_macro_image(slideRef, width=None, height=None, sessionID=None, verify=True):
     """Get the macro image for a slide"""
     sessionID = _pma_session_id(sessionID)
@@ -1055,34 +1347,19 @@ def get_macro_image(slideRef, width=None, height=None, sessionID=None, verify=Tr
     url = get_macro_url(slideRef, width, height, sessionID)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     img = Image.open(BytesIO(r.content))
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(r.content)
     return img
 
 
-def get_tile_url(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, format="jpg", quality=100, verify=True):
+def _pma_tile_params(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, channels=0, timeframe=0):
     """
-    Get a single tile at position (x, y)
-    Format can be 'jpg' or 'png'
-    Quality is an integer value and varies from 0 (as much compression as possible; not recommended) to 100 (100%, no compression)
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
     """
-    sessionID = _pma_session_id(sessionID)
-    if (slideRef.startswith("/")):
-        slideRef = slideRef[1:]
-    if (zoomlevel is None):
-        zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
-
-    url = _pma_url(sessionID) + "tile"
-    if url is None:
-        raise Exception(
-            "Unable to determine the PMA.core instance belonging to " + str(sessionID))
-
-    params = {
+    return {
         "sessionID": sessionID,
-        "channels": 0,
-        "timeframe": 0,
+        "channels": int(channels),
+        "timeframe": int(timeframe),
         "layer": int(round(zstack)),
         "pathOrUid": slideRef,
         "x": int(round(x)),
@@ -1093,11 +1370,43 @@ def get_tile_url(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, f
         "cache": str(_pma_usecachewhenretrievingtiles).lower()
     }
 
-    r = requests.get(url, params=params, verify=verify)
-    return r.request.url
+
+def _pma_region_params(slideRef, x, y, width, height, scale, zstack, sessionID, format, quality, rotation, contrast,
+                       brightness, postGamma, dpi, flipVertical, flipHorizontal, annotationsLayerType, drawFilename,
+                       downloadInsteadOfDisplay, drawScaleBar, gamma, channelClipping, channels=0, timeframe=0):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    return {
+        "sessionID": sessionID,
+        "channels": int(channels),
+        "timeframe": int(timeframe),
+        "layer": int(round(zstack)),
+        "pathOrUid": slideRef,
+        "x": int(round(x)),
+        "y": int(round(y)),
+        "width": int(round(width)),
+        "height": int(round(height)),
+        "scale": float(scale),
+        "format": format,
+        "quality": quality,
+        "rotation": float(rotation),
+        "contrast": contrast,
+        "brightness": brightness,
+        "postGamma": postGamma,
+        "dpi": dpi,
+        "flipVertical": flipVertical,
+        "flipHorizontal": flipHorizontal,
+        "annotationsLayerType": annotationsLayerType,
+        "drawFilename": drawFilename,
+        "downloadInsteadOfDisplay": downloadInsteadOfDisplay,
+        "drawScaleBar": drawScaleBar,
+        "gamma": ",".join([str(s) for s in gamma]),
+        "channelClipping": ",".join([str(s) for s in channelClipping])
+    }
 
 
-def get_tile(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, format="jpg", quality=100, verify=True):
+def get_tile_url(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, format="jpg", quality=100, verify=True):
     """
     Get a single tile at position (x, y)
     Format can be 'jpg' or 'png'
@@ -1114,41 +1423,220 @@ def get_tile(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, forma
         raise Exception(
             "Unable to determine the PMA.core instance belonging to " + str(sessionID))
 
-    params = {
-        "sessionID": sessionID,
-        "channels": 0,
-        "timeframe": 0,
-        "layer": int(round(zstack)),
-        "pathOrUid": slideRef,
-        "x": int(round(x)),
-        "y": int(round(y)),
-        "z": int(round(zoomlevel)),
-        "format": format,
-        "quality": quality,
-        "cache": str(_pma_usecachewhenretrievingtiles).lower()
-    }
+    params = _pma_tile_params(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality)
+
+    r = pma._pma_http_request("GET", url, sessionID, params=params, verify=verify)
+    return r.request.url
+
+
+def _pma_tile_cache_key(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, channels=0, timeframe=0):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    return (_pma_url(sessionID), slideRef, int(round(x)), int(round(y)), int(round(zoomlevel)), int(round(zstack)),
+            format, quality, int(channels), int(timeframe))
+
+
+def _pma_get_tile_bytes(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, verify=True, channels=0,
+                        timeframe=0):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Return the compressed tile as sent by PMA.core, consulting the client-side tile cache first (when enabled)
+    """
+    cache = _pma_tile_cache
+    disk_cache = _pma_disk_tile_cache
+    key = _pma_tile_cache_key(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, channels, timeframe)
+    if cache is not None:
+        content = cache.get(key)
+        pma._pma_instant_event("cache", "tile", sessionID, hit=content is not None, cache="memory")
+        if content is not None:
+            return content
+    if disk_cache is not None:
+        stamp = _pma_slide_version_stamp(slideRef, sessionID, verify)
+        content = disk_cache.get(key, stamp)
+        pma._pma_instant_event("cache", "tile", sessionID, hit=content is not None, cache="disk")
+        if content is not None:
+            if cache is not None:
+                cache.put(key, content)
+            return content
+
+    url = _pma_url(sessionID) + "tile"
+    if url is None:
+        raise Exception(
+            "Unable to determine the PMA.core instance belonging to " + str(sessionID))
+
+    params = _pma_tile_params(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, channels, timeframe)
 
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, params=params, verify=verify)
-    img = Image.open(BytesIO(r.content))
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(r.content)
-    return img
+    def fetch():
+        r = pma._pma_http_request("GET", url, sessionID, params=params, verify=verify)
+        if r.status_code == 200:
+            if cache is not None:
+                cache.put(key, r.content)
+            if disk_cache is not None:
+                disk_cache.put(key, key[:2], stamp, r.content)
+        return r.content
+
+    # the cache key is shared by all sessions on a server; a request is only shared within a session, whose
+    # credentials it is made with
+    return _pma_coalesce(("tile", sessionID) + key, fetch)
+
+
+def _pma_slide_version_stamp(slideRef, sessionID=None, verify=True):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Return the LastModified date of a slide (as milliseconds since the epoch) to version cached tiles with
+    """
+    info = get_slide_info(slideRef, sessionID, verify)
+    match = re.search(r"-?\d+", str(info.get("LastModified", "")))
+    return int(match.group(0)) if match else 0
+
+
+def _pma_decode_image(content, output="pil", out=None):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Turn an encoded image as sent by PMA.core into the requested output type:
+    "pil" returns a PIL Image, "bytes" returns the encoded data as-is (no decoding at all) and
+    "numpy" returns a (height, width, bands) uint8 array, decoded into the preallocated out array when one is given
+    """
+    if output == "pil":
+        return Image.open(BytesIO(content))
+    elif output == "bytes":
+        return content
+    elif output == "numpy":
+        img = Image.open(BytesIO(content))
+        if img.mode not in ("L", "RGB", "RGBA"):
+            img = img.convert("RGB")
+        arr = np.asarray(img, dtype=np.uint8)
+        if out is None:
+            return arr
+        if arr.ndim == 2 and out.shape == arr.shape + (1,):
+            arr = arr[..., np.newaxis]
+        if out.shape != arr.shape:
+            raise ValueError("out array has shape " + str(out.shape) + ", but the image has shape " + str(arr.shape))
+        np.copyto(out, arr, casting="unsafe")
+        return out
+    else:
+        raise ValueError("output must be one of 'pil', 'bytes' or 'numpy'")
+
+
+@pma._pma_traced
+def get_tile(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, format="jpg", quality=100, verify=True,
+             output="pil", out=None, channels=0, timeframe=0, timeout=None):
+    """
+    Get a single tile at position (x, y)
+    Format can be 'jpg' or 'png'
+    Quality is an integer value and varies from 0 (as much compression as possible; not recommended) to 100 (100%, no compression)
+    Output can be 'pil' (a PIL Image), 'bytes' (the encoded tile as sent by PMA.core, without decoding it) or
+    'numpy' (a uint8 array of shape (height, width, bands)); with 'numpy', pass a preallocated array as out to decode into
+    Channels and timeframe select the fluorescent channel and the timeframe to retrieve the tile from
+    Timeout is the maximum number of seconds to spend on the tile (default: see set_timeout)
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
+
+    with pma._pma_deadline_scope(timeout):
+        content = _pma_get_tile_bytes(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality, verify,
+                                      channels, timeframe)
+    return _pma_decode_image(content, output, out)
+
+
+def enable_tile_cache(max_bytes=256 * 1024 * 1024):
+    """
+    Keep recently retrieved tiles in memory, so repeated requests for the same tile don't go back to PMA.core.
+    Tiles are stored compressed (as sent by the server); least recently used tiles are evicted once
+    the cache holds more than max_bytes. Calling this again replaces the existing cache with an empty one
+    """
+    global _pma_tile_cache
+    _pma_tile_cache = TileCache(max_bytes)
+    return _pma_tile_cache
+
+
+def disable_tile_cache():
+    """
+    Stop caching tiles in memory and release the memory held by the tile cache
+    """
+    global _pma_tile_cache
+    _pma_tile_cache = None
+
+
+def clear_tile_cache():
+    """
+    Remove all tiles from the in-memory tile cache (if enabled) and reset its counters
+    """
+    if _pma_tile_cache is not None:
+        _pma_tile_cache.clear()
+
+
+def enable_disk_tile_cache(path, max_bytes=10 * 1024 * 1024 * 1024):
+    """
+    Keep retrieved tiles in a persistent cache in directory path, e.g. to avoid downloading the same tiles
+    again in every epoch of a training job. The cache can be shared by several processes on the same machine.
+    Cached tiles of a slide are invalidated when its LastModified date (see get_slide_info) changes.
+    The cache is compacted when it grows beyond max_bytes
+    """
+    global _pma_disk_tile_cache
+    if _pma_disk_tile_cache is not None:
+        _pma_disk_tile_cache.close()
+    _pma_disk_tile_cache = DiskTileCache(path, max_bytes)
+    return _pma_disk_tile_cache
 
 
+def disable_disk_tile_cache():
+    """
+    Stop using the persistent tile cache. The files on disk are left untouched
+    """
+    global _pma_disk_tile_cache
+    if _pma_disk_tile_cache is not None:
+        _pma_disk_tile_cache.close()
+    _pma_disk_tile_cache = None
+
+
+def get_disk_tile_cache_stats():
+    """
+    Return hits, misses, stale tiles, compactions, number of entries and size of the persistent tile cache.
+    Returns None when the persistent tile cache isn't enabled
+    """
+    if _pma_disk_tile_cache is None:
+        return None
+    return _pma_disk_tile_cache.stats()
+
+
+def get_tile_cache_stats():
+    """
+    Return hits, misses, evictions, number of entries and bytes held by the in-memory tile cache.
+    Returns None when the tile cache isn't enabled
+    """
+    if _pma_tile_cache is None:
+        return None
+    return _pma_tile_cache.stats()
+
+
+@pma._pma_traced
 def get_region(slideRef, x=0, y=0, width=0, height=0, scale=1, zstack=0, sessionID=None, format="jpg", quality=100,
                rotation=0,
                contrast=None, brightness=None, postGamma=None, dpi=300, flipVertical=False, flipHorizontal=False,
                annotationsLayerType=None, drawFilename=0,
-               downloadInsteadOfDisplay=False, drawScaleBar=False, gamma=[], channelClipping=[], verify=True):
+               downloadInsteadOfDisplay=False, drawScaleBar=False, gamma=[], channelClipping=[], verify=True,
+               output="pil", out=None, channels=0, timeframe=0, timeout=None):
     """
     Gets a region of the slide at the specified scale 
     Format can be 'jpg' or 'png'
     Quality is an integer value and varies from 0 (as much compression as possible; not recommended) to 100 (100%, no compression)
     x,y,width,height is the region to get
     rotation is the rotation in degrees of the slide to get
+    Output can be 'pil' (a PIL Image), 'bytes' (the encoded region, without decoding it) or 'numpy' (a uint8 array);
+    with 'numpy', pass a preallocated array as out to decode into
+    Channels and timeframe select the fluorescent channel and the timeframe to retrieve the region from
+    Timeout is the maximum number of seconds to spend on the region (default: see set_timeout)
     """
     sessionID = _pma_session_id(sessionID)
     if (slideRef.startswith("/")):
@@ -1159,42 +1647,21 @@ def get_region(slideRef, x=0, y=0, width=0, height=0, scale=1, zstack=0, session
         raise Exception(
             "Unable to determine the PMA.core instance belonging to " + str(sessionID))
 
-    params = {
-        "sessionID": sessionID,
-        "channels": 0,
-        "timeframe": 0,
-        "layer": int(round(zstack)),
-        "pathOrUid": slideRef,
-        "x": int(round(x)),
-        "y": int(round(y)),
-        "width": int(round(width)),
-        "height": int(round(height)),
-        "scale": float(scale),
-        "format": format,
-        "quality": quality,
-        "rotation": float(rotation),
-        "contrast": contrast,
-        "brightness": brightness,
-        "postGamma": postGamma,
-        "dpi": dpi,
-        "flipVertical": flipVertical,
-        "flipHorizontal": flipHorizontal,
-        "annotationsLayerType": annotationsLayerType,
-        "drawFilename": drawFilename,
-        "downloadInsteadOfDisplay": downloadInsteadOfDisplay,
-        "drawScaleBar": drawScaleBar,
-        "gamma": ",".join([str(s) for s in gamma]),
-        "channelClipping": ",".join([str(s) for s in channelClipping])
-    }
+    params = _pma_region_params(slideRef, x, y, width, height, scale, zstack, sessionID, format, quality, rotation,
+                                contrast, brightness, postGamma, dpi, flipVertical, flipHorizontal,
+                                annotationsLayerType, drawFilename, downloadInsteadOfDisplay, drawScaleBar, gamma,
+                                channelClipping, channels, timeframe)
 
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, params=params, verify=verify)
-    img = Image.open(BytesIO(r.content))
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(r.content)
-    return img
+    def fetch():
+        r = pma._pma_http_request("GET", url, sessionID, params=params, verify=verify)
+        return r.content
+
+    with pma._pma_deadline_scope(timeout):
+        content = _pma_coalesce(("region", url, repr(sorted(params.items()))), fetch)
+    return _pma_decode_image(content, output, out)
 
 
 def get_submitted_forms(slideRef, sessionID=None, verify=True):
@@ -1207,11 +1674,9 @@ def get_submitted_forms(slideRef, sessionID=None, verify=True):
     all_forms = get_available_forms(slideRef, sessionID)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_available_forms on  " +
                             slideRef + " resulted in: " + json["Message"])
@@ -1236,11 +1701,9 @@ def get_submitted_form_data(slideRef, sessionID=None, verify=True):
           pma._pma_q(sessionID) + "&pathOrUids=" + pma._pma_q(slideRef)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_available_forms on  " +
                             slideRef + " resulted in: " + json["Message"])
@@ -1270,11 +1733,9 @@ def get_available_forms(slideRef=None, sessionID=None, verify=True):
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_available_forms on  " +
                             slideRef + " resulted in: " + json["Message"])
@@ -1297,11 +1758,9 @@ def prepare_form_dictionary(formID, sessionID=None, verify=True):
           "GetFormDefinitions?sessionID=" + pma._pma_q(sessionID)
     if pma._pma_debug == True:
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_available_forms on  " +
                             formID + " resulted in: " + json["Message"])
@@ -1339,11 +1798,9 @@ def get_annotations(slideRef, sessionID=None, verify=True):
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     if ((not (r.text is None)) and (len(r.text) > 0)):
         json = r.json()
-        global _pma_amount_of_data_downloaded
-        _pma_amount_of_data_downloaded[sessionID] += len(json)
         if ("Code" in json):
             raise Exception("get_annotations() on  " +
                             slideRef + " resulted in: " + json["Message"])
@@ -1371,7 +1828,7 @@ def export_annotations(slideRef, annotation_source_format=[pma_annotation_source
     if (pma._pma_debug is True):
         print(url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
 
     if (r.ok):
         return BytesIO(r.content)
@@ -1380,6 +1837,215 @@ def export_annotations(slideRef, annotation_source_format=[pma_annotation_source
     return None
 
 
+def _pma_run_concurrently(fn, items, workers=8, max_in_flight=None, ordered=True, executor=None):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Apply fn to every element of items using a bounded pool of worker threads and yield (item, result) pairs.
+    At most max_in_flight calls are outstanding at any given time (defaults to twice the number of workers),
+    so arbitrarily long (lazy) item sequences can be processed without queueing everything up front.
+    When ordered is True, results come back in the order of items; otherwise in order of completion.
+    Every call runs in a copy of the caller's context, so a deadline (see deadline()) carries over to the workers.
+    Pass an executor (e.g. a ProcessPoolExecutor) to run fn there instead; it is not shut down afterwards,
+    and fn then needs to be picklable (contexts are not carried over to other processes).
+    """
+    workers = max(1, int(workers))
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    max_in_flight = max(1, int(max_in_flight))
+
+    if executor is None:
+        def submit(item):
+            return pool.submit(contextvars.copy_context().run, fn, item)
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        def submit(item):
+            return executor.submit(fn, item)
+        pool = contextlib.nullcontext()
+
+    items = iter(items)
+    with pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, submit(item)))
+                if len(pending) >= max_in_flight:
+                    break
+
+            while pending:
+                if ordered:
+                    item, future = pending.popleft()
+                    result = future.result()
+                else:
+                    done, _ = wait([f for (_, f) in pending], return_when=FIRST_COMPLETED)
+                    idx = next(i for (i, (_, f)) in enumerate(pending) if f in done)
+                    item, future = pending[idx]
+                    del pending[idx]
+                    result = future.result()
+
+                # top up the pipeline before handing the result to the consumer
+                for item_next in items:
+                    pending.append((item_next, submit(item_next)))
+                    if len(pending) >= max_in_flight:
+                        break
+
+                yield item, result
+        finally:
+            # the consumer may stop iterating early (or an exception was raised); don't start work nobody asked for
+            for (_, f) in pending:
+                f.cancel()
+
+
+def _pma_otsu_threshold(values):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Otsu's threshold for an array of uint8 values (maximises the between-class variance)
+    """
+    hist = np.bincount(values.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_bg[-1] - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(np.nan_to_num(between)))
+
+
+@pma._pma_traced
+def get_tissue_map(slideRef, zoomlevel=None, sessionID=None, thumbnail_size=1024, verify=True):
+    """
+    Estimate which tiles of a zoomlevel contain tissue, based on a single thumbnail of the slide.
+    Tissue is detected as the pixels whose color saturation exceeds an Otsu threshold (glass is grey/white).
+    Returns a (ytiles, xtiles) float array with the fraction of every tile that is covered with tissue
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = get_max_zoomlevel(slideRef, sessionID)
+
+    thumb = get_thumbnail_image(slideRef, width=thumbnail_size, height=thumbnail_size, sessionID=sessionID,
+                                verify=verify)
+    saturation = np.asarray(thumb.convert("RGB").convert("HSV"), dtype=np.uint8)[..., 1]
+    # never call (nearly) unsaturated pixels tissue, even when the whole thumbnail is background
+    mask = saturation > max(_pma_otsu_threshold(saturation), 15)
+    (thumb_h, thumb_w) = mask.shape
+
+    info = get_slide_info(slideRef, sessionID, verify)
+    tile_size = int(info["TileSize"])
+    (level_w, level_h) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+    xtiles = int(ceil(level_w / tile_size))
+    ytiles = int(ceil(level_h / tile_size))
+
+    # tile boundaries, expressed in thumbnail pixels; every tile covers at least one thumbnail pixel
+    def bounds(ntiles, level_size, thumb_size):
+        edges = np.minimum(np.arange(ntiles + 1) * tile_size, level_size) * (thumb_size / level_size)
+        lo = np.clip(np.floor(edges[:-1]).astype(np.int64), 0, thumb_size - 1)
+        hi = np.clip(np.ceil(edges[1:]).astype(np.int64), lo + 1, thumb_size)
+        return lo, hi
+
+    (x0, x1) = bounds(xtiles, level_w, thumb_w)
+    (y0, y1) = bounds(ytiles, level_h, thumb_h)
+
+    # summed area table, so the tissue pixels under every tile can be counted without looping over tiles
+    sat = np.zeros((thumb_h + 1, thumb_w + 1), dtype=np.int64)
+    sat[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+    tissue = (sat[y1][:, x1] - sat[y0][:, x1] - sat[y1][:, x0] + sat[y0][:, x0])
+    area = (y1 - y0)[:, np.newaxis] * (x1 - x0)[np.newaxis, :]
+    return tissue / area
+
+
+def _pma_hilbert_d2xy(n, d):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Convert a distance d along a Hilbert curve that fills an n x n grid (n a power of 2) into (x, y)
+    """
+    x = y = 0
+    s = 1
+    t = d
+    while s < n:
+        rx = 1 & (t // 2)
+        ry = 1 & (t ^ rx)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        x += s * rx
+        y += s * ry
+        t //= 4
+        s *= 2
+    return x, y
+
+
+def _pma_zorder_d2xy(d):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    De-interleave the bits of a Morton (Z-order) code d into (x, y)
+    """
+    x = y = 0
+    bit = 0
+    while d:
+        x |= (d & 1) << bit
+        y |= ((d >> 1) & 1) << bit
+        d >>= 2
+        bit += 1
+    return x, y
+
+
+def _pma_tile_order(fromX, toX, fromY, toY, order="column"):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Generate the (x, y) tile positions of a rectangle in the requested traversal order:
+    "column" (top to bottom, then left to right), "row" (left to right, then top to bottom; matches the
+    row-major tile layout of most slide formats), "hilbert" or "zorder" (space-filling curves that keep
+    consecutive tiles close to each other in both directions)
+    """
+    if order == "column":
+        for x in range(fromX, toX):
+            for y in range(fromY, toY):
+                yield (x, y)
+    elif order == "row":
+        for y in range(fromY, toY):
+            for x in range(fromX, toX):
+                yield (x, y)
+    elif order in ("hilbert", "zorder"):
+        (w, h) = (toX - fromX, toY - fromY)
+        if w <= 0 or h <= 0:
+            return
+        n = 1
+        while n < max(w, h):
+            n *= 2
+        d2xy = (lambda d: _pma_hilbert_d2xy(n, d)) if order == "hilbert" else _pma_zorder_d2xy
+        # the curve covers the enclosing power-of-2 square; every stretch of size * size positions starting at a
+        # multiple of that fills one aligned size x size quadrant, so quadrants outside the rectangle are skipped
+        # as a whole and only those straddling its edges are split further
+        stack = [(0, n)]
+        while stack:
+            (d0, size) = stack.pop()
+            (x, y) = d2xy(d0)
+            (qx, qy) = (x - x % size, y - y % size)
+            if qx >= w or qy >= h:
+                continue
+            if qx + size <= w and qy + size <= h:
+                yield (fromX + x, fromY + y)
+                for d in range(d0 + 1, d0 + size * size):
+                    (x, y) = d2xy(d)
+                    yield (fromX + x, fromY + y)
+                continue
+            quarter = (size // 2) ** 2
+            stack.extend((d0 + i * quarter, size // 2) for i in (3, 2, 1, 0))
+    else:
+        raise ValueError("order must be one of 'row', 'column', 'hilbert' or 'zorder'")
+
+
+@pma._pma_traced
 def get_tiles(slideRef,
               fromX=0,
               fromY=0,
@@ -1389,15 +2055,35 @@ def get_tiles(slideRef,
               zstack=0,
               sessionID=None,
               format="jpg",
-              quality=100):
+              quality=100,
+              workers=1,
+              max_in_flight=None,
+              ordered=True,
+              with_coords=False,
+              output="pil",
+              tissue_only=False,
+              tissue_threshold=0.1,
+              order="column",
+              timeout=None):
     """
     Get all tiles with a (fromX, fromY, toX, toY) rectangle. Navigate left to right, top to bottom
     Format can be 'jpg' or 'png'
     Quality is an integer value and varies from 0 (as much compression as possible; not recommended) to 100 (100%, no compression)
+    Set workers to a value larger than 1 to fetch tiles concurrently; max_in_flight caps the number of outstanding requests
+    When ordered is False, tiles are yielded as soon as they arrive rather than in traversal order
+    When with_coords is True, (x, y, zoomlevel, tile) tuples are yielded instead of bare tiles
+    Output can be 'pil', 'bytes' or 'numpy' (see get_tile)
+    When tissue_only is True, tiles that are covered for less than tissue_threshold with tissue are skipped
+    (see get_tissue_map); this requires one extra request for a thumbnail of the slide
+    Order determines the traversal: 'column' (default), 'row', 'hilbert' or 'zorder'. Row-major and the
+    space-filling curves match the way most slide formats (and PMA.core's own tile cache) store tiles
+    Timeout is the total number of seconds that fetching all tiles may take; when it runs out,
+    requests.exceptions.Timeout is raised and the outstanding requests are cancelled
     """
     sessionID = _pma_session_id(sessionID)
     if (slideRef.startswith("/")):
         slideRef = slideRef[1:]
+    until = None if timeout is None else time.monotonic() + timeout
 
     if (zoomlevel is None):
         zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
@@ -1405,16 +2091,1182 @@ def get_tiles(slideRef,
         toX = get_number_of_tiles(slideRef, zoomlevel, sessionID)[0]
     if (toY is None):
         toY = get_number_of_tiles(slideRef, zoomlevel, sessionID)[1]
-    for x in range(fromX, toX):
-        for y in range(fromY, toY):
-            yield get_tile(slideRef=slideRef,
-                           x=x,
-                           y=y,
-                           zstack=zstack,
-                           zoomlevel=zoomlevel,
-                           sessionID=sessionID,
-                           format=format,
-                           quality=quality)
+
+    coords = _pma_tile_order(fromX, toX, fromY, toY, order)
+    if tissue_only is True:
+        with pma._pma_deadline_scope(until=until):
+            tissue = get_tissue_map(slideRef, zoomlevel, sessionID)
+        coords = ((x, y) for (x, y) in coords
+                  if y < tissue.shape[0] and x < tissue.shape[1] and tissue[y, x] >= tissue_threshold)
+    for tile in get_tiles_batch(slideRef, coords, zoomlevel=zoomlevel, zstack=zstack, sessionID=sessionID,
+                                format=format, quality=quality, workers=workers, max_in_flight=max_in_flight,
+                                ordered=ordered, output=output,
+                                timeout=None if until is None else until - time.monotonic()):
+        if with_coords is True:
+            yield tile
+        else:
+            yield tile[3]
+
+
+@pma._pma_traced
+def get_tiles_batch(slideRef,
+                    coords,
+                    zoomlevel=None,
+                    zstack=0,
+                    sessionID=None,
+                    format="jpg",
+                    quality=100,
+                    workers=8,
+                    max_in_flight=None,
+                    ordered=True,
+                    verify=True,
+                    output="pil",
+                    timeout=None):
+    """
+    Get an arbitrary collection of tiles, given as an iterable of (x, y) tile positions
+    Tiles are fetched by a pool of worker threads, with at most max_in_flight requests outstanding at any time
+    (defaults to twice the number of workers).
+    When ordered is True, tiles are yielded in the order of coords; otherwise in the order in which they arrive
+    Every result is an (x, y, zoomlevel, tile) tuple; output can be 'pil', 'bytes' or 'numpy' (see get_tile)
+    Timeout is the total number of seconds that fetching all tiles may take (see get_tiles)
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
+    until = None if timeout is None else time.monotonic() + timeout
+
+    def fetch(xy):
+        # the budget is shared by all tiles, and set per fetch so it also holds in the worker threads
+        with pma._pma_deadline_scope(until=until):
+            return get_tile(slideRef=slideRef, x=xy[0], y=xy[1], zoomlevel=zoomlevel, zstack=zstack,
+                            sessionID=sessionID, format=format, quality=quality, verify=verify, output=output)
+
+    if workers is None or workers <= 1:
+        for (x, y) in coords:
+            yield (x, y, zoomlevel, fetch((x, y)))
+        return
+
+    for ((x, y), tile) in _pma_run_concurrently(fetch, coords, workers, max_in_flight, ordered):
+        yield (x, y, zoomlevel, tile)
+
+
+def _pma_tile_nbytes(tile):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    if isinstance(tile, (bytes, bytearray)):
+        return len(tile)
+    if isinstance(tile, np.ndarray):
+        return tile.nbytes
+    if isinstance(tile, Image.Image):
+        return tile.width * tile.height * len(tile.getbands())
+    return 0
+
+
+@pma._pma_traced
+def prefetch_tiles(slideRef,
+                   fromX=0,
+                   fromY=0,
+                   toX=None,
+                   toY=None,
+                   zoomlevel=None,
+                   zstack=0,
+                   sessionID=None,
+                   format="jpg",
+                   quality=100,
+                   workers=4,
+                   depth=16,
+                   max_bytes=64 * 1024 * 1024,
+                   with_coords=False,
+                   output="pil",
+                   tissue_only=False,
+                   tissue_threshold=0.1,
+                   order="column",
+                   timeout=None):
+    """
+    Read-ahead version of get_tiles: a background thread keeps fetching (and decoding) the next tiles of the
+    traversal while the consumer is working on the current one, so fetching and computing overlap.
+    At most depth tiles, taking up at most max_bytes (decoded), are buffered; when the buffer is full the
+    background thread waits for the consumer to catch up. A single tile larger than max_bytes is still delivered.
+    Closing the generator (or breaking out of the loop) stops the read-ahead.
+    All other arguments are the same as for get_tiles
+    """
+    depth = max(1, int(depth))
+    buffered = deque()
+    state = {"bytes": 0, "done": False, "error": None}
+    condition = threading.Condition()
+    stop = threading.Event()
+
+    def produce():
+        tiles = get_tiles(slideRef, fromX=fromX, fromY=fromY, toX=toX, toY=toY, zoomlevel=zoomlevel,
+                          zstack=zstack, sessionID=sessionID, format=format, quality=quality, workers=workers,
+                          ordered=True, with_coords=True, output=output, tissue_only=tissue_only,
+                          tissue_threshold=tissue_threshold, order=order, timeout=timeout)
+        try:
+            for tile in tiles:
+                size = _pma_tile_nbytes(tile[3])
+                with condition:
+                    # backpressure: wait until there is room in the buffer, both in number of tiles and in bytes
+                    while not stop.is_set() and buffered and (
+                            len(buffered) >= depth or state["bytes"] + size > max_bytes):
+                        condition.wait()
+                    if stop.is_set():
+                        break
+                    buffered.append((tile, size))
+                    state["bytes"] += size
+                    condition.notify_all()
+        except Exception as e:
+            state["error"] = e
+        finally:
+            tiles.close()
+            with condition:
+                state["done"] = True
+                condition.notify_all()
+
+    producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name="pma_python-prefetch",
+                                daemon=True)
+    producer.start()
+    try:
+        while True:
+            with condition:
+                while not buffered and not state["done"]:
+                    condition.wait()
+                if not buffered:
+                    break
+                (tile, size) = buffered.popleft()
+                state["bytes"] -= size
+                condition.notify_all()
+            if with_coords is True:
+                yield tile
+            else:
+                yield tile[3]
+        if state["error"] is not None:
+            raise state["error"]
+    finally:
+        stop.set()
+        with condition:
+            buffered.clear()
+            condition.notify_all()
+        producer.join()
+
+
+def _pma_region_tiles(slideRef, x, y, width, height, zoomlevel, sessionID=None, verify=True):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Return the geometry needed to assemble the (x, y, width, height) pixel rectangle at zoomlevel from tiles:
+    the tile size, the pixel dimensions of the zoomlevel and the (inclusive) range of tiles covering the rectangle
+    """
+    info = get_slide_info(slideRef, sessionID, verify)
+    (tile_w, tile_h) = (int(info["TileSize"]), int(info["TileSize"]))
+    (xtiles, ytiles, _) = get_zoomlevels_dict(slideRef, sessionID)[zoomlevel]
+    (level_w, level_h) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+    (level_w, level_h) = (int(level_w), int(level_h))
+
+    x, y, width, height = int(x), int(y), int(width), int(height)
+    tx0, ty0 = max(0, x // tile_w), max(0, y // tile_h)
+    tx1, ty1 = min(xtiles - 1, (x + width - 1) // tile_w), min(ytiles - 1, (y + height - 1) // tile_h)
+    return (tile_w, tile_h), (level_w, level_h), (tx0, tx1, ty0, ty1)
+
+
+def _pma_blit_tile(tile, tx, ty, tile_size, level_size, x, y, width, height, out):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Copy the part of tile (tx, ty) that overlaps the (x, y, width, height) rectangle into the (height, width, bands)
+    array out. Different tiles write to disjoint parts of out, so this is safe to do from several threads
+    """
+    if tile.ndim == 2:
+        tile = tile[..., np.newaxis]
+    (tile_w, tile_h) = tile_size
+    # intersection of the tile and the requested region, in level pixel coordinates
+    sx0, sy0 = max(x, tx * tile_w), max(y, ty * tile_h)
+    sx1 = min(x + width, tx * tile_w + tile.shape[1], level_size[0])
+    sy1 = min(y + height, ty * tile_h + tile.shape[0], level_size[1])
+    if sx1 > sx0 and sy1 > sy0:
+        out[sy0 - y:sy1 - y, sx0 - x:sx1 - x] = tile[sy0 - ty * tile_h:sy1 - ty * tile_h,
+                                                     sx0 - tx * tile_w:sx1 - tx * tile_w, :out.shape[2]]
+
+
+def _pma_stitch_region(slideRef, x, y, width, height, zoomlevel, zstack, sessionID, format, quality, out,
+                       workers=8, verify=True, order="row", channels=0, timeframe=0):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Assemble the (x, y, width, height) pixel rectangle at zoomlevel from tiles, fetched concurrently,
+    into the (height, width, bands) array out. Pixels outside of the slide are left untouched
+    """
+    x, y, width, height = int(x), int(y), int(width), int(height)
+    (tile_size, level_size, (tx0, tx1, ty0, ty1)) = _pma_region_tiles(slideRef, x, y, width, height, zoomlevel,
+                                                                      sessionID, verify)
+
+    def fetch(txy):
+        (tx, ty) = txy
+        content = _pma_get_tile_bytes(slideRef, tx, ty, zoomlevel, zstack, sessionID, format, quality, verify,
+                                      channels, timeframe)
+        _pma_blit_tile(_pma_decode_image(content, "numpy"), tx, ty, tile_size, level_size, x, y, width, height, out)
+
+    tiles = _pma_tile_order(tx0, tx1 + 1, ty0, ty1 + 1, order)
+    if workers is None or workers <= 1:
+        for txy in tiles:
+            fetch(txy)
+        return out
+
+    for _ in _pma_run_concurrently(fetch, tiles, workers, ordered=False):
+        pass
+    return out
+
+
+@pma._pma_traced
+def get_region_from_tiles(slideRef, x=0, y=0, width=0, height=0, zoomlevel=None, zstack=0, sessionID=None,
+                          format="jpg", quality=100, workers=8, out=None, verify=True, order="row"):
+    """
+    Get a region of the slide by stitching it together from tiles on the client side,
+    rather than having PMA.core render it (like get_region does)
+    x, y, width, height are expressed in pixels at the requested zoomlevel (default: the highest zoomlevel).
+    Tiles are fetched concurrently and go through the tile caches (see enable_tile_cache), so overlapping regions,
+    e.g. in a sliding window analysis, only download every tile once.
+    Returns a (height, width, 3) uint8 array; pass a preallocated array as out to fill that one instead.
+    Parts of the region that lie outside of the slide are black
+    Order is the order in which tiles are requested ('row', 'column', 'hilbert' or 'zorder'; see get_tiles)
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = get_max_zoomlevel(slideRef, sessionID)
+
+    if out is None:
+        out = np.zeros((int(height), int(width), 3), dtype=np.uint8)
+    elif out.shape[:2] != (int(height), int(width)) or out.ndim != 3:
+        raise ValueError("out array must have shape (" + str(int(height)) + ", " + str(int(width)) + ", bands)")
+
+    return _pma_stitch_region(slideRef, x, y, width, height, zoomlevel, zstack, sessionID, format, quality, out,
+                              workers, verify, order)
+
+
+@pma._pma_traced
+def read_level(slideRef, zoomlevel, path, zstack=0, sessionID=None, format="jpg", quality=100, workers=8,
+               verify=True, order="row"):
+    """
+    Materialise an entire zoomlevel of a slide into a memory-mapped file at path, and return it as a
+    (height, width, 3) uint8 numpy.memmap. Tiles are fetched concurrently and written directly into the
+    mapped file, so even gigapixel levels can be processed with NumPy/SciPy without holding them in memory
+    Order is the order in which tiles are requested ('row', 'column', 'hilbert' or 'zorder'; see get_tiles)
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+
+    (width, height) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+    arr = np.memmap(path, dtype=np.uint8, mode="w+", shape=(int(height), int(width), 3))
+    _pma_stitch_region(slideRef, 0, 0, width, height, zoomlevel, zstack, sessionID, format, quality, arr,
+                       workers, verify, order)
+    arr.flush()
+    return arr
+
+
+@pma._pma_traced
+def get_hyperstack_region(slideRef, x=0, y=0, width=0, height=0, zoomlevel=None, channels=None, zstack=None,
+                          timeframes=None, sessionID=None, format="jpg", quality=100, workers=8, verify=True):
+    """
+    Get a region of a multi-dimensional slide as a single (T, Z, C, height, width) uint8 array.
+    x, y, width, height are expressed in pixels at the requested zoomlevel (default: the highest zoomlevel).
+    Channels, zstack and timeframes are an index or a list of indices; None (the default) means all of them.
+    For fluorescent slides the C axis holds the requested channels; for brightfield slides it holds the RGB bands.
+    The tiles of all planes are fetched concurrently and go through the tile caches (see enable_tile_cache)
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = get_max_zoomlevel(slideRef, sessionID)
+
+    def as_list(value, count):
+        if value is None:
+            return list(range(count))
+        if isinstance(value, int):
+            return [value]
+        return list(value)
+
+    info = get_slide_info(slideRef, sessionID, verify)
+    fluorescent = is_fluorescent(slideRef, sessionID)
+    timeframes = as_list(timeframes, len(info["TimeFrames"]))
+    zstack = as_list(zstack, get_number_of_z_stack_layers(slideRef, sessionID))
+    channels = as_list(channels, get_number_of_channels(slideRef, sessionID)) if fluorescent else [0]
+
+    x, y, width, height = int(x), int(y), int(width), int(height)
+    (tile_size, level_size, (tx0, tx1, ty0, ty1)) = _pma_region_tiles(slideRef, x, y, width, height, zoomlevel,
+                                                                      sessionID, verify)
+    out = np.zeros((len(timeframes), len(zstack), len(channels) if fluorescent else 3, height, width),
+                   dtype=np.uint8)
+
+    def fetch(task):
+        (ti, zi, ci, tx, ty) = task
+        content = _pma_get_tile_bytes(slideRef, tx, ty, zoomlevel, zstack[zi], sessionID, format, quality, verify,
+                                      channels[ci], timeframes[ti])
+        tile = _pma_decode_image(content, "numpy")
+        if fluorescent:
+            # a channel comes back rendered in its display colour; its intensity is the brightest band
+            tile = tile.max(axis=2) if tile.ndim == 3 else tile
+            target = out[ti, zi, ci][..., np.newaxis]
+        else:
+            target = np.moveaxis(out[ti, zi], 0, -1)
+        _pma_blit_tile(tile, tx, ty, tile_size, level_size, x, y, width, height, target)
+
+    tasks = [(ti, zi, ci, tx, ty)
+             for ti in range(len(timeframes))
+             for zi in range(len(zstack))
+             for ci in range(len(channels))
+             for (tx, ty) in _pma_tile_order(tx0, tx1 + 1, ty0, ty1 + 1, "row")]
+    for _ in _pma_run_concurrently(fetch, tasks, workers, ordered=False):
+        pass
+    return out
+
+
+def _pma_map_slides_call(job):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Run fn(slideRef, sessionID) for map_slides(), turning an exception into a result so one slide can't stop the run
+    """
+    (fn, slideRef, sessionID) = job
+    try:
+        return True, fn(slideRef, sessionID), None
+    except Exception as e:
+        return False, e, traceback.format_exc()
+
+
+@pma._pma_traced
+def map_slides(fn, slides, sessionID=None, workers=4, backend="process", prewarm=True, progress_callback=None,
+               verify=True):
+    """
+    Run fn(slideRef, sessionID) for every slide in slides, in parallel, and return a (results, failures) tuple:
+    results maps every slide that was processed successfully to what fn returned, failures maps every other slide
+    to the exception that was raised (with the formatted traceback in its pma_traceback attribute).
+    Backend 'process' runs fn in a pool of worker processes (fn then needs to be picklable, i.e. defined at module
+    level, and the calling script guarded with if __name__ == "__main__"); backend 'thread' uses threads.
+    Workers continue with the session of the caller, without authenticating again; with prewarm, the slide
+    information of all slides is retrieved up front (concurrently) and handed to the workers as well.
+    Progress_callback is called as progress_callback(done, total, slideRef, success) after every slide;
+    pass True to print progress instead
+    """
+    if backend not in ("process", "thread"):
+        raise ValueError("backend must be 'process' or 'thread'")
+    sessionID = _pma_session_id(sessionID)
+    slides = list(slides)
+    workers = max(1, int(workers))
+
+    if progress_callback is True:
+        def progress_callback(done, total, slideRef, success):
+            print("Processed {0}/{1} slides ({2}{3})".format(done, total, slideRef, "" if success else ", failed"))
+
+    if prewarm is True:
+        def warm(slideRef):
+            try:
+                get_slide_info(slideRef, sessionID, verify)
+            except Exception:
+                pass  # the slide's own job will run into (and report) the same problem
+
+        for _ in _pma_run_concurrently(warm, slides, min(workers * 2, 16), ordered=False):
+            pass
+
+    executor = None
+    if backend == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_pma_restore_session_context,
+                                       initargs=(_pma_session_context(sessionID, slides),))
+
+    outcomes = {}
+    try:
+        jobs = ((fn, slideRef, sessionID) for slideRef in slides)
+        for (job, (success, value, tb)) in _pma_run_concurrently(_pma_map_slides_call, jobs, workers,
+                                                                 ordered=False, executor=executor):
+            if not success:
+                value.pma_traceback = tb
+            outcomes[job[1]] = (success, value)
+            if callable(progress_callback):
+                progress_callback(len(outcomes), len(slides), job[1], success)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    results = {slideRef: outcomes[slideRef][1] for slideRef in slides if outcomes[slideRef][0]}
+    failures = {slideRef: outcomes[slideRef][1] for slideRef in slides if not outcomes[slideRef][0]}
+    return results, failures
+
+
+def _pma_atomic_write(path, data):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Write data to path through a temporary file in the same directory, so an interrupted export never leaves a
+    truncated file behind (and resuming can trust every file that exists)
+    """
+    tmp = path + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@pma._pma_traced
+def export_to_zarr(slideRef, path, zoomlevels=None, zstack=0, sessionID=None, format="jpg", quality=100, workers=8,
+                   compression_level=5, verify=True):
+    """
+    Export (selected zoomlevels of) a slide to a Zarr (v2) directory store at path, e.g. for processing with Dask
+    without going back to PMA.core. Every zoomlevel becomes a (3, height, width) uint8 array named after the
+    zoomlevel, chunked per tile (one chunk per PMA.core tile) and zlib-compressed; the root group carries
+    OME-NGFF 'multiscales' metadata, listing the levels from the highest to the lowest resolution.
+    Tiles are fetched concurrently. An interrupted export can be resumed by calling export_to_zarr again:
+    chunks that already exist are skipped. Returns path
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if zoomlevels is None:
+        zoomlevels = get_zoomlevels_list(slideRef, sessionID)
+    zoomlevels = sorted(set(int(z) for z in zoomlevels), reverse=True)
+
+    info = get_slide_info(slideRef, sessionID, verify)
+    tile_size = int(info["TileSize"])
+    tiles = get_zoomlevels_dict(slideRef, sessionID)
+
+    os.makedirs(path, exist_ok=True)
+    _pma_atomic_write(os.path.join(path, ".zgroup"), jsonlib.dumps({"zarr_format": 2}).encode())
+
+    datasets = []
+    jobs = []
+    for zoomlevel in zoomlevels:
+        if zoomlevel not in tiles:
+            raise ValueError("Zoomlevel " + str(zoomlevel) + " does not exist for " + slideRef)
+        (width, height) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+        (width, height) = (int(width), int(height))
+        (mpp_x, mpp_y) = get_pixels_per_micrometer(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+        datasets.append({"path": str(zoomlevel),
+                         "coordinateTransformations": [{"type": "scale", "scale": [1.0, mpp_y, mpp_x]}]})
+
+        array_dir = os.path.join(path, str(zoomlevel))
+        os.makedirs(array_dir, exist_ok=True)
+        zarray = {
+            "zarr_format": 2,
+            "shape": [3, height, width],
+            "chunks": [3, tile_size, tile_size],
+            "dtype": "|u1",
+            "compressor": {"id": "zlib", "level": int(compression_level)},
+            "fill_value": 0,
+            "order": "C",
+            "filters": None,
+        }
+        zarray_path = os.path.join(array_dir, ".zarray")
+        if os.path.exists(zarray_path):
+            with open(zarray_path) as f:
+                existing = jsonlib.load(f)
+            if existing["shape"] != zarray["shape"] or existing["chunks"] != zarray["chunks"]:
+                raise ValueError("Existing array " + array_dir + " does not match zoomlevel " + str(zoomlevel) +
+                                 " of " + slideRef + "; remove it first")
+        else:
+            _pma_atomic_write(zarray_path, jsonlib.dumps(zarray, indent=4).encode())
+
+        (xtiles, ytiles, _) = tiles[zoomlevel]
+        for ty in range(int(ceil(height / tile_size))):
+            for tx in range(int(ceil(width / tile_size))):
+                chunk_path = os.path.join(array_dir, "0." + str(ty) + "." + str(tx))
+                if tx < xtiles and ty < ytiles and not os.path.exists(chunk_path):
+                    jobs.append((zoomlevel, tx, ty, width, height, chunk_path))
+
+    _pma_atomic_write(os.path.join(path, ".zattrs"), jsonlib.dumps({"multiscales": [{
+        "version": "0.4",
+        "name": slideRef,
+        "axes": [{"name": "c", "type": "channel"},
+                 {"name": "y", "type": "space", "unit": "micrometer"},
+                 {"name": "x", "type": "space", "unit": "micrometer"}],
+        "datasets": datasets,
+    }]}, indent=4).encode())
+
+    def export_chunk(job):
+        (zoomlevel, tx, ty, width, height, chunk_path) = job
+        content = _pma_get_tile_bytes(slideRef, tx, ty, zoomlevel, zstack, sessionID, format, quality, verify)
+        tile = _pma_decode_image(content, "numpy")
+        # chunks always have the full chunk shape; pixels outside of the level are zero (the fill value)
+        h = min(tile.shape[0], tile_size, height - ty * tile_size)
+        w = min(tile.shape[1], tile_size, width - tx * tile_size)
+        chunk = np.zeros((3, tile_size, tile_size), dtype=np.uint8)
+        chunk[:, :h, :w] = np.moveaxis(tile[:h, :w, :3], -1, 0)
+        _pma_atomic_write(chunk_path, zlib.compress(chunk.tobytes(), int(compression_level)))
+
+    for _ in _pma_run_concurrently(export_chunk, jobs, workers, ordered=False):
+        pass
+    return path
+
+
+def _pma_jpeg_frame(content):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Return (width, height, sampling) from the frame header of a baseline JPEG stream, where sampling are the
+    (horizontal, vertical) sampling factors of the first component; or None when content isn't a baseline JPEG
+    """
+    if content[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(content):
+        if content[i] != 0xFF:
+            return None
+        marker = content[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        length = struct.unpack(">H", content[i + 2:i + 4])[0]
+        if marker == 0xC0:
+            (height, width, components) = struct.unpack(">HHB", content[i + 5:i + 10])
+            if components != 3:
+                return None
+            factors = content[i + 11]
+            return width, height, (factors >> 4, factors & 0x0F)
+        if marker in (0xC1, 0xC2, 0xC3, 0xDA):
+            # not baseline (or no frame header before the scan): TIFF readers can't be trusted with these
+            return None
+        i += 2 + length
+    return None
+
+
+def _pma_tiff_ifd(offset, entries, next_ifd=0):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Serialize a BigTIFF IFD that will be written at offset. Entries are (tag, type, values) tuples;
+    values that don't fit in an entry are stored right after the IFD. Returns the bytes and the position
+    (within them) of the next-IFD pointer
+    """
+    formats = {2: "s", 3: "H", 4: "I", 5: "II", 16: "Q"}
+    entries = sorted(entries)
+    head_size = 8 + 20 * len(entries) + 8
+    head = [struct.pack("<Q", len(entries))]
+    extra = []
+    extra_offset = offset + head_size
+    for (tag, type, values) in entries:
+        if type == 2:
+            data = values.encode("ascii") + b"\x00"
+            count = len(data)
+        else:
+            values = list(values)
+            count = len(values) if type != 5 else len(values) // 2
+            data = struct.pack("<" + formats[type][0] * len(values), *values)
+        if len(data) <= 8:
+            head.append(struct.pack("<HHQ", tag, type, count) + data.ljust(8, b"\x00"))
+        else:
+            head.append(struct.pack("<HHQQ", tag, type, count, extra_offset))
+            if len(data) % 2:
+                data += b"\x00"
+            extra.append(data)
+            extra_offset += len(data)
+    head.append(struct.pack("<Q", next_ifd))
+    return b"".join(head) + b"".join(extra), head_size - 8
+
+
+@pma._pma_traced
+def export_to_tiff(slideRef, path, level=None, quality=90, zstack=0, sessionID=None, workers=8, verify=True):
+    """
+    Export a slide to a tiled, JPEG-compressed pyramidal BigTIFF file at path.
+    Level is the highest zoomlevel to include (default: the highest zoomlevel of the slide); the lower
+    resolutions are PMA.core's own zoomlevels below it, down to the first one that fits in a single tile.
+    Tiles are fetched concurrently (quality is the JPEG quality requested from PMA.core) and streamed to the file
+    as they arrive; they are stored as PMA.core sends them, only tiles at the right and bottom edges are
+    decoded to pad them to the full tile size. The physical resolution is taken from get_pixels_per_micrometer.
+    Returns path
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if level is None:
+        level = get_max_zoomlevel(slideRef, sessionID)
+    info = get_slide_info(slideRef, sessionID, verify)
+    tile_size = int(info["TileSize"])
+    if tile_size % 16 != 0:
+        raise ValueError("TIFF tiles must be a multiple of 16 pixels; " + slideRef + " has tiles of " +
+                         str(tile_size) + " pixels")
+
+    levels = []
+    for zoomlevel in range(int(level), -1, -1):
+        (width, height) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+        levels.append((zoomlevel, int(width), int(height)))
+        if width <= tile_size and height <= tile_size:
+            break
+
+    with open(path, "wb") as f:
+        # BigTIFF header: byte order, version 43, 8-byte offsets, offset of the first IFD (patched below)
+        f.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, 0))
+        next_pointer = 8
+
+        for (index, (zoomlevel, width, height)) in enumerate(levels):
+            (xtiles, ytiles) = (int(ceil(width / tile_size)), int(ceil(height / tile_size)))
+            offsets = [0] * (xtiles * ytiles)
+            counts = [0] * (xtiles * ytiles)
+
+            def fetch(txy, factors=None):
+                (tx, ty) = txy
+                content = _pma_get_tile_bytes(slideRef, tx, ty, zoomlevel, zstack, sessionID, "jpg", quality,
+                                              verify)
+                frame = _pma_jpeg_frame(content)
+                if frame is not None and frame[:2] == (tile_size, tile_size) and \
+                        (factors is None or frame[2] == factors):
+                    return content, frame[2]
+                # edge tile (or a tile we can't pass through as is): pad to the full tile size and re-encode,
+                # with the chroma subsampling that all tiles of a level have to share
+                factors = factors or (2, 2)
+                tile = _pma_decode_image(content, "numpy")[:tile_size, :tile_size, :3]
+                full = np.zeros((tile_size, tile_size, 3), dtype=np.uint8)
+                full[:tile.shape[0], :tile.shape[1]] = tile
+                buf = BytesIO()
+                Image.fromarray(full).save(buf, "JPEG", quality=min(int(quality), 95),
+                                           subsampling={(1, 1): 0, (2, 1): 1, (2, 2): 2}[factors])
+                return buf.getvalue(), factors
+
+            # the first tile determines the chroma subsampling of the level
+            (content, factors) = fetch((0, 0))
+            if factors not in ((1, 1), (2, 1), (2, 2)):
+                (content, factors) = fetch((0, 0), (2, 2))
+            offsets[0] = f.tell()
+            counts[0] = len(content)
+            f.write(content)
+
+            coords = [(tx, ty) for ty in range(ytiles) for tx in range(xtiles) if (tx, ty) != (0, 0)]
+            for ((tx, ty), (content, _)) in _pma_run_concurrently(lambda txy: fetch(txy, factors), coords, workers,
+                                                                  ordered=False):
+                offsets[ty * xtiles + tx] = f.tell()
+                counts[ty * xtiles + tx] = len(content)
+                f.write(content)
+
+            (mpp_x, mpp_y) = get_pixels_per_micrometer(slideRef, sessionID=sessionID, zoomlevel=zoomlevel)
+            entries = [
+                (254, 4, [0 if index == 0 else 1]),  # NewSubfileType: reduced resolution version
+                (256, 4, [width]),
+                (257, 4, [height]),
+                (258, 3, [8, 8, 8]),
+                (259, 3, [7]),  # JPEG
+                # the tiles are JFIF streams, which store YCbCr; declaring them RGB would make readers skip the
+                # color conversion
+                (262, 3, [6]),
+                (277, 3, [3]),
+                (282, 5, [int(round(10000 / mpp_x * 1000)), 1000]),  # pixels per centimetre
+                (283, 5, [int(round(10000 / mpp_y * 1000)), 1000]),
+                (284, 3, [1]),
+                (296, 3, [3]),  # ResolutionUnit: centimetre
+                (305, 2, "pma_python " + __version__),
+                (322, 4, [tile_size]),
+                (323, 4, [tile_size]),
+                (324, 16, offsets),
+                (325, 16, counts),
+                (530, 3, list(factors)),
+            ]
+            if index == 0:
+                entries.append((270, 2, "Exported from " + slideRef + " by pma_python"))
+
+            if f.tell() % 2:
+                f.write(b"\x00")
+            ifd_offset = f.tell()
+            (ifd, pointer) = _pma_tiff_ifd(ifd_offset, entries)
+            f.write(ifd)
+            # link the previous IFD (or the header) to this one
+            f.seek(next_pointer)
+            f.write(struct.pack("<Q", ifd_offset))
+            f.seek(0, os.SEEK_END)
+            next_pointer = ifd_offset + pointer
+    return path
+
+
+@pma._pma_traced
+def export_to_dzi(slideRef, out_dir, tile_size=254, overlap=1, format="jpg", quality=90, name=None, zstack=0,
+                  sessionID=None, workers=8, verify=True):
+    """
+    Export a slide as a static DeepZoom (DZI) pyramid: out_dir/name.dzi plus the out_dir/name_files tile tree
+    (name defaults to the slide's file name without extension). Format is the format of the DZI tiles ('jpg' or
+    'png'), quality the JPEG quality. DeepZoom levels that coincide with PMA.core zoomlevels are assembled from
+    PMA.core's tiles (fetched concurrently); when tile_size matches the slide's tile size, overlap is 0 and format
+    is 'jpg', these are stored as PMA.core sends them. The (small) levels below zoomlevel 0 are downscaled from it.
+    An interrupted export can be resumed by calling export_to_dzi again: tiles that already exist are skipped,
+    and the .dzi descriptor is only written once all tiles are there. Returns the path of the .dzi descriptor
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    format = format.lower()
+    if format not in ("jpg", "jpeg", "png"):
+        raise ValueError("format must be 'jpg' or 'png'")
+    format = "jpg" if format == "jpeg" else format
+    if name is None:
+        name = os.path.splitext(os.path.basename(slideRef))[0]
+    tile_size, overlap = int(tile_size), int(overlap)
+
+    max_zoomlevel = get_max_zoomlevel(slideRef, sessionID)
+    (width, height) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=max_zoomlevel)
+    (width, height) = (int(width), int(height))
+    server_tile_size = int(get_slide_info(slideRef, sessionID, verify)["TileSize"])
+    max_level = int(ceil(log2(max(width, height, 1))))
+    files_dir = os.path.join(out_dir, name + "_files")
+
+    jobs = []
+    for level in range(max_level, -1, -1):
+        scale = 2 ** (max_level - level)
+        (w, h) = (int(ceil(width / scale)), int(ceil(height / scale)))
+        zoomlevel = max_zoomlevel - (max_level - level)
+        os.makedirs(os.path.join(files_dir, str(level)), exist_ok=True)
+        for row in range(int(ceil(h / tile_size))):
+            for col in range(int(ceil(w / tile_size))):
+                tile_path = os.path.join(files_dir, str(level), str(col) + "_" + str(row) + "." + format)
+                if not os.path.exists(tile_path):
+                    jobs.append((level, zoomlevel, col, row, w, h, tile_path))
+
+    # PMA.core's zoomlevel 0 is the source for all DeepZoom levels below it
+    downscaled = {}
+    if any(job[1] < 0 for job in jobs):
+        (w0, h0) = get_pixel_dimensions(slideRef, sessionID=sessionID, zoomlevel=0)
+        base = Image.fromarray(get_region_from_tiles(slideRef, 0, 0, int(w0), int(h0), zoomlevel=0, zstack=zstack,
+                                                     sessionID=sessionID, quality=quality, workers=workers,
+                                                     verify=verify))
+        for (level, zoomlevel, col, row, w, h, tile_path) in jobs:
+            if zoomlevel < 0 and level not in downscaled:
+                downscaled[level] = np.asarray(base.resize((w, h), Image.LANCZOS))
+
+    # neighbouring DeepZoom tiles share PMA.core tiles when the tile sizes differ or there is overlap;
+    # keep the recent ones around for the duration of the export
+    recent = TileCache(64 * 1024 * 1024)
+
+    def fetch_tile(tx, ty, zoomlevel):
+        key = (tx, ty, zoomlevel)
+        content = recent.get(key)
+        if content is None:
+            content = _pma_get_tile_bytes(slideRef, tx, ty, zoomlevel, zstack, sessionID, "jpg", quality, verify)
+            recent.put(key, content)
+        return content
+
+    def export_tile(job):
+        (level, zoomlevel, col, row, w, h, tile_path) = job
+        (x0, y0) = (max(col * tile_size - overlap, 0), max(row * tile_size - overlap, 0))
+        (x1, y1) = (min((col + 1) * tile_size + overlap, w), min((row + 1) * tile_size + overlap, h))
+        if zoomlevel < 0:
+            arr = downscaled[level][y0:y1, x0:x1]
+        else:
+            if overlap == 0 and tile_size == server_tile_size and format == "jpg":
+                content = fetch_tile(col, row, zoomlevel)
+                frame = _pma_jpeg_frame(content)
+                if frame is not None and frame[:2] == (x1 - x0, y1 - y0):
+                    _pma_atomic_write(tile_path, content)
+                    return
+            arr = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+            (tiles, level_size, (tx0, tx1, ty0, ty1)) = _pma_region_tiles(slideRef, x0, y0, x1 - x0, y1 - y0,
+                                                                          zoomlevel, sessionID, verify)
+            for ty in range(ty0, ty1 + 1):
+                for tx in range(tx0, tx1 + 1):
+                    tile = _pma_decode_image(fetch_tile(tx, ty, zoomlevel), "numpy")
+                    _pma_blit_tile(tile, tx, ty, tiles, level_size, x0, y0, x1 - x0, y1 - y0, arr)
+        buf = BytesIO()
+        if format == "jpg":
+            Image.fromarray(arr).save(buf, "JPEG", quality=min(int(quality), 95))
+        else:
+            Image.fromarray(arr).save(buf, "PNG")
+        _pma_atomic_write(tile_path, buf.getvalue())
+
+    for _ in _pma_run_concurrently(export_tile, jobs, workers, ordered=False):
+        pass
+
+    dzi_path = os.path.join(out_dir, name + ".dzi")
+    _pma_atomic_write(dzi_path, (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="' + format + '" Overlap="' +
+        str(overlap) + '" TileSize="' + str(tile_size) + '">\n'
+        '    <Size Width="' + str(width) + '" Height="' + str(height) + '"/>\n'
+        '</Image>\n').encode("utf-8"))
+    return dzi_path
+
+
+# **************************************#
+#     === Native asyncio API ===        #
+# **************************************#
+_pma_aiohttp_sessions = dict()
+_pma_async_connection_limit = 100
+
+
+def _pma_import_aiohttp():
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("The asyncio API requires aiohttp; install it with: pip install pma_python[async]")
+    return aiohttp
+
+
+def _pma_aiohttp_session(sessionID=None):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    aiohttp sessions are bound to the event loop they were created in, so one is kept per (sessionID, loop)
+    """
+    aiohttp = _pma_import_aiohttp()
+    global _pma_aiohttp_sessions
+
+    loop = asyncio.get_running_loop()
+    key = (sessionID, loop)
+    session = _pma_aiohttp_sessions.get(key)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=_pma_async_connection_limit)
+        session = aiohttp.ClientSession(connector=connector)
+        _pma_aiohttp_sessions[key] = session
+    return session
+
+
+def _pma_async_params(params):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    aiohttp refuses None and bool query values; drop and stringify them the way requests does
+    """
+    if params is None:
+        return None
+    return {k: (str(v) if isinstance(v, bool) else v) for (k, v) in params.items() if v is not None}
+
+
+async def _pma_http_get_async(url, sessionID=None, params=None, verify=True):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Asynchronous counterpart of pma._pma_request_with_retry() for GET requests: applies the same timeout, deadline,
+    retry policy and circuit breaker
+    """
+    aiohttp = _pma_import_aiohttp()
+    session = _pma_aiohttp_session(sessionID)
+    policy = pma._pma_retry_policy
+    retries = policy["retries"] if "GET" in policy["methods"] else 0
+    endpoint = pma._pma_endpoint(url)
+    parts = urlsplit(url)
+    server = parts.scheme + "://" + parts.netloc
+
+    attempt = 0
+    while True:
+        pma._pma_breaker_check(server, policy)
+        timeout = pma._pma_request_timeout()
+        remaining = pma._pma_remaining_time()
+        shortened = pma._pma_deadline_shortens()
+        if isinstance(timeout, tuple):
+            timeout = aiohttp.ClientTimeout(total=remaining, sock_connect=timeout[0], sock_read=timeout[-1])
+        else:
+            timeout = aiohttp.ClientTimeout(total=remaining, sock_connect=timeout, sock_read=timeout)
+        event = pma._pma_start_event("http", endpoint, sessionID, method="GET", url=server + parts.path)
+        start = time.perf_counter()
+        try:
+            async with session.get(url, params=_pma_async_params(params), ssl=None if verify else False,
+                                   timeout=timeout) as r:
+                content = await r.read()
+        except Exception as e:
+            pma._pma_record_request(sessionID, endpoint, time.perf_counter() - start, error=True)
+            pma._pma_end_event(event, e, status=None, bytes_received=0, bytes_sent=0)
+            if not isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                raise
+            if isinstance(e, asyncio.TimeoutError) and (shortened or not pma._pma_fits_deadline(0)):
+                # the deadline ran out, not the server: don't count this against its circuit breaker
+                raise
+            pma._pma_breaker_record(server, False, policy)
+            delay = pma._pma_retry_delay(attempt, None, policy)
+            if attempt >= retries or not pma._pma_fits_deadline(delay):
+                raise
+        else:
+            pma._pma_record_request(sessionID, endpoint, time.perf_counter() - start, len(content), 0,
+                                    r.status >= 400)
+            pma._pma_end_event(event, None, status=r.status, bytes_received=len(content), bytes_sent=0)
+            if r.status not in policy["status_forcelist"]:
+                pma._pma_breaker_record(server, True, policy)
+                return r.status, content
+            pma._pma_breaker_record(server, False, policy)
+            delay = pma._pma_retry_delay(attempt, r, policy)
+            if attempt >= retries or not pma._pma_fits_deadline(delay):
+                return r.status, content
+        if pma._pma_debug == True:
+            print("Retrying GET", url, "in", round(delay, 2), "seconds")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def set_async_connection_limit(limit):
+    """
+    Set the maximum number of simultaneous connections per event loop for the asyncio API.
+    Only affects sessions that are created afterwards
+    """
+    global _pma_async_connection_limit
+    if not isinstance(limit, int) or limit < 0:
+        raise ValueError("limit argument must be a non-negative integer (0 means unlimited)")
+    _pma_async_connection_limit = limit
+
+
+async def close_async_sessions(sessionID=None):
+    """
+    Close the connections held by the asyncio API in the running event loop.
+    When sessionID is None, all asyncio connections of the running event loop are closed
+    """
+    loop = asyncio.get_running_loop()
+    for key in list(_pma_aiohttp_sessions.keys()):
+        (sid, session_loop) = key
+        if session_loop is loop and (sessionID is None or sid == sessionID):
+            await _pma_aiohttp_sessions.pop(key).close()
+
+
+@pma._pma_traced
+async def get_tile_async(slideRef, x=0, y=0, zoomlevel=None, zstack=0, sessionID=None, format="jpg", quality=100,
+                         verify=True, output="pil", out=None):
+    """
+    Asynchronous counterpart of get_tile()
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+    if (zoomlevel is None):
+        zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
+
+    cache = _pma_tile_cache
+    key = None
+    content = None
+    if cache is not None:
+        key = _pma_tile_cache_key(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality)
+        content = cache.get(key)
+        pma._pma_instant_event("cache", "tile", sessionID, hit=content is not None, cache="memory")
+
+    if content is None:
+        url = _pma_url(sessionID) + "tile"
+        params = _pma_tile_params(slideRef, x, y, zoomlevel, zstack, sessionID, format, quality)
+        if pma._pma_debug == True:
+            print(url)
+
+        (status, content) = await _pma_http_get_async(url, sessionID, params=params, verify=verify)
+        if cache is not None and status == 200:
+            cache.put(key, content)
+    return _pma_decode_image(content, output, out)
+
+
+@pma._pma_traced
+async def get_region_async(slideRef, x=0, y=0, width=0, height=0, scale=1, zstack=0, sessionID=None, format="jpg",
+                           quality=100, rotation=0, contrast=None, brightness=None, postGamma=None, dpi=300,
+                           flipVertical=False, flipHorizontal=False, annotationsLayerType=None, drawFilename=0,
+                           downloadInsteadOfDisplay=False, drawScaleBar=False, gamma=[], channelClipping=[],
+                           verify=True, output="pil", out=None):
+    """
+    Asynchronous counterpart of get_region()
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+
+    url = _pma_url(sessionID) + "region"
+    params = _pma_region_params(slideRef, x, y, width, height, scale, zstack, sessionID, format, quality, rotation,
+                                contrast, brightness, postGamma, dpi, flipVertical, flipHorizontal,
+                                annotationsLayerType, drawFilename, downloadInsteadOfDisplay, drawScaleBar, gamma,
+                                channelClipping)
+    if pma._pma_debug == True:
+        print(url)
+
+    (_, content) = await _pma_http_get_async(url, sessionID, params=params, verify=verify)
+    return _pma_decode_image(content, output, out)
+
+
+@pma._pma_traced
+async def get_slide_info_async(slideRef, sessionID=None, verify=True):
+    """
+    Asynchronous counterpart of get_slide_info(); shares its cache with get_slide_info()
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+
+    cache = _pma_slideinfos[sessionID]
+
+    async def request():
+        url = _pma_api_url(sessionID) + "GetImageInfo?SessionID=" + \
+              pma._pma_q(sessionID) + "&pathOrUid=" + pma._pma_q(slideRef)
+        if pma._pma_debug == True:
+            print(url)
+        (status, content) = await _pma_http_get_async(url, sessionID, verify=verify)
+        if status != 200:
+            raise Exception("ImageInfo to " + slideRef + " error")
+
+        json = jsonlib.loads(content)
+        if ("Code" in json or 'Message' in json):
+            raise Exception("ImageInfo to " + slideRef +
+                            " resulted in: " + json["Message"])
+        return json["d"] if "d" in json else json
+
+    async def fingerprint():
+        url = _pma_api_url(sessionID) + "GetFingerprint?sessionID=" + \
+              pma._pma_q(sessionID) + "&pathOrUid=" + pma._pma_q(slideRef)
+        (_, content) = await _pma_http_get_async(url, sessionID, verify=verify)
+        json = jsonlib.loads(content)
+        if ("Code" in json):
+            raise Exception("get_fingerprint on  " + slideRef +
+                            " resulted in: " + json["Message"])
+        return json
+
+    entry = cache.lookup(slideRef)
+    if entry is not None and entry[2]:
+        if pma._pma_debug == True:
+            print("Getting slide info from cache")
+        return entry[0]
+
+    # the same steps as get_slide_info(), with the requests awaited
+    handlers = {"fingerprint": fingerprint, "info": request}
+    steps = _pma_slide_info_steps(cache, slideRef, entry)
+    try:
+        need = next(steps)
+        while True:
+            need = steps.send(await handlers[need]())
+    except StopIteration as done:
+        return done.value
+
+
+@pma._pma_traced
+async def get_directories_async(startDir, sessionID=None, recursive=False, verify=True):
+    """
+    Asynchronous counterpart of get_directories(); sub-directories are traversed concurrently
+    """
+    sessionID = _pma_session_id(sessionID)
+    url = _pma_api_url(sessionID) + "GetDirectories?sessionID=" + \
+          pma._pma_q(sessionID) + "&path=" + pma._pma_q(startDir)
+    if pma._pma_debug == True:
+        print(url)
+    (_, content) = await _pma_http_get_async(url, sessionID, verify=verify)
+    json = jsonlib.loads(content)
+    if ("Code" in json):
+        raise Exception("get_directories to " + startDir +
+                        " resulted in: " + json["Message"])
+    elif ("d" in json):
+        dirs = json["d"]
+    else:
+        dirs = json
+
+    if (type(recursive) == bool and recursive is True) or (type(recursive) == int and recursive > 0):
+        sub_recursive = recursive if type(recursive) == bool else recursive - 1
+        subdirs = await asyncio.gather(*[get_directories_async(dir, sessionID, sub_recursive, verify)
+                                         for dir in dirs])
+        for sub in subdirs:
+            dirs = dirs + sub
+
+    return dirs
+
+
+@pma._pma_traced
+async def get_slides_async(startDir, sessionID=None, recursive=False, verify=True):
+    """
+    Asynchronous counterpart of get_slides(); sub-directories are traversed concurrently
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (startDir.startswith("/")):
+        startDir = startDir[1:]
+    url = _pma_api_url(sessionID) + "GetFiles?sessionID=" + \
+          pma._pma_q(sessionID) + "&path=" + pma._pma_q(startDir)
+    if pma._pma_debug == True:
+        print(url)
+    (_, content) = await _pma_http_get_async(url, sessionID, verify=verify)
+    json = jsonlib.loads(content)
+    if ("Code" in json):
+        raise Exception("get_slides from " + startDir +
+                        " resulted in: " + json["Message"])
+    elif ("d" in json):
+        slides = json["d"]
+    else:
+        slides = json
+
+    if (type(recursive) == bool and recursive is True) or (type(recursive) == int and recursive > 0):
+        sub_recursive = recursive if type(recursive) == bool else recursive - 1
+        dirs = await get_directories_async(startDir, sessionID, verify=verify)
+        subslides = await asyncio.gather(*[get_slides_async(dir, sessionID, sub_recursive, verify)
+                                           for dir in dirs])
+        for sub in subslides:
+            slides = slides + sub
+
+    return slides
+
+
+async def _pma_run_concurrently_async(coro_fn, items, max_in_flight=32, ordered=True):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Asynchronous counterpart of _pma_run_concurrently(): await coro_fn(item) for every element of items,
+    with at most max_in_flight coroutines running at any given time, and yield (item, result) pairs
+    """
+    max_in_flight = max(1, int(max_in_flight))
+    items = iter(items)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, asyncio.ensure_future(coro_fn(item))))
+            if len(pending) >= max_in_flight:
+                break
+
+        while pending:
+            if ordered:
+                item, task = pending.popleft()
+                result = await task
+            else:
+                done, _ = await asyncio.wait([t for (_, t) in pending], return_when=asyncio.FIRST_COMPLETED)
+                idx = next(i for (i, (_, t)) in enumerate(pending) if t in done)
+                item, task = pending[idx]
+                del pending[idx]
+                result = task.result()
+
+            for item_next in items:
+                pending.append((item_next, asyncio.ensure_future(coro_fn(item_next))))
+                if len(pending) >= max_in_flight:
+                    break
+
+            yield item, result
+    finally:
+        for (_, t) in pending:
+            t.cancel()
+
+
+@pma._pma_traced
+async def get_tiles_async(slideRef,
+                          fromX=0,
+                          fromY=0,
+                          toX=None,
+                          toY=None,
+                          zoomlevel=None,
+                          zstack=0,
+                          sessionID=None,
+                          format="jpg",
+                          quality=100,
+                          max_in_flight=32,
+                          ordered=True,
+                          with_coords=False,
+                          verify=True,
+                          output="pil",
+                          order="column"):
+    """
+    Asynchronous counterpart of get_tiles(), to be used with "async for".
+    Up to max_in_flight tiles are requested concurrently over a shared, non-blocking connection pool
+    """
+    sessionID = _pma_session_id(sessionID)
+    if (slideRef.startswith("/")):
+        slideRef = slideRef[1:]
+
+    if (zoomlevel is None):
+        zoomlevel = 0  # get_max_zoomlevel(slideRef, sessionID)
+    if (toX is None or toY is None):
+        await get_slide_info_async(slideRef, sessionID, verify)
+        (xtiles, ytiles, _) = get_number_of_tiles(slideRef, zoomlevel, sessionID)
+        toX = xtiles if toX is None else toX
+        toY = ytiles if toY is None else toY
+
+    async def fetch(xy):
+        return await get_tile_async(slideRef, xy[0], xy[1], zoomlevel, zstack, sessionID, format, quality, verify,
+                                    output)
+
+    coords = _pma_tile_order(fromX, toX, fromY, toY, order)
+    async for ((x, y), tile) in _pma_run_concurrently_async(fetch, coords, max_in_flight, ordered):
+        if with_coords is True:
+            yield (x, y, zoomlevel, tile)
+        else:
+            yield tile
 
 
 def show_slide(slideRef, sessionID=None):
@@ -1447,6 +3299,7 @@ def show_slide(slideRef, sessionID=None):
     os.system(os_cmd + url)
 
 
+@pma._pma_traced
 def get_files_for_slide(slideRef, sessionID=None, verify=True):
     """Obtain all files actually associated with a specific slide
     This is most relevant with slides that are defined by multiple files, like MRXS or VSI"""
@@ -1465,10 +3318,8 @@ def get_files_for_slide(slideRef, sessionID=None, verify=True):
     if pma._pma_debug == True:
         print(url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("enumerate_files_for_slide on  " +
                         slideRef + " resulted in: " + json["Message"])
@@ -1488,6 +3339,7 @@ def get_files_for_slide(slideRef, sessionID=None, verify=True):
     return retval
 
 
+@pma._pma_traced
 def search_slides(startDir, pattern, sessionID=None, verify=True):
     sessionID = _pma_session_id(sessionID)
     if (sessionID == _pma_pmacoreliteSessionID):
@@ -1506,10 +3358,8 @@ def search_slides(startDir, pattern, sessionID=None, verify=True):
     if pma._pma_debug == True:
         print("url =", url)
 
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, verify=verify)
     json = r.json()
-    global _pma_amount_of_data_downloaded
-    _pma_amount_of_data_downloaded[sessionID] += len(json)
     if ("Code" in json):
         raise Exception("search_slides on  " + startDir +
                         " resulted in: " + json["Message"])
@@ -1563,13 +3413,18 @@ class UploadChunksIterator:
         return self.total_size
 
 
-def download(slideRef, save_directory=None, sessionID=None, verify=True):
+@pma._pma_traced
+def download(slideRef, save_directory=None, sessionID=None, verify=True, timeout=None):
     """
         Downloads a slide from a PMA.core server.
         :param str slideRef: The virtual path to the slide
         :param str save_directory: The local directory to save the downloaded files to
         :param str sessionID: The sessionID to authenticate to the pma.core server
+        :param float timeout: The total number of seconds the download may take (default: no limit)
     """
+    if timeout is not None:
+        with pma._pma_deadline_scope(timeout):
+            return download(slideRef, save_directory, sessionID, verify)
 
     def get_filename_from_cd(cd):
         """
@@ -1607,7 +3462,7 @@ def download(slideRef, save_directory=None, sessionID=None, verify=True):
         params = {"sessionId": sessionID,
                   "image": slideRef, "path": relativePath}
 
-        with requests.get(pmaCoreDownloadUrl, params=params, stream=True, verify=verify) as r:
+        with pma._pma_http_request("GET", pmaCoreDownloadUrl, sessionID, params=params, stream=True, verify=verify) as r:
             r.raise_for_status()
 
             total = int(r.headers.get('content-length'))
@@ -1622,6 +3477,8 @@ def download(slideRef, save_directory=None, sessionID=None, verify=True):
             prev = -1
             with open(filePath, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=10 * 1024):
+                    # raises once the deadline of the surrounding scope (if any) has passed
+                    pma._pma_remaining_time()
                     if chunk:
                         downloaded += len(chunk)
                         f.write(chunk)
@@ -1698,7 +3555,7 @@ def add_annotation(slideRef, classification, notes, ann, color="#000000", layerI
         print("payload = ")
         pprint(data)
 
-    r = requests.post(url, json=data, verify=verify)
+    r = pma._pma_http_request("POST", url, sessionID, json=data, verify=verify)
 
     if isinstance(r.json(), int):
         return {'Code': 'Success', 'Message': 'Annotation successfully added', 'annotation_id': r.json()}
@@ -1796,7 +3653,7 @@ def add_annotations(slideRef, classification, notes, anns, color="#000000", laye
         print("payload = ")
         pprint(data)
 
-    r = requests.post(url, json=data, verify=verify)
+    r = pma._pma_http_request("POST", url, sessionID, json=data, verify=verify)
 
     if pma._pma_debug == True:
         print("HTTP return value = ", r.status_code)
@@ -1842,7 +3699,7 @@ def clear_annotations(slideRef, layerID, sessionID=None, verify=True):
     url = _pma_api_url(sessionID) + "DeleteAnnotations"
     data = {"sessionID": sessionID, "pathOrUid": slideRef, "layerID": layerID}
 
-    r = requests.post(url, json=data, verify=verify)
+    r = pma._pma_http_request("POST", url, sessionID, json=data, verify=verify)
     if (r.status_code != 200):
         raise Exception("clear_annotation on  " +
                         slideRef + " resulted in error")
@@ -1864,7 +3721,7 @@ def get_annotation_surface_area(slideRef, layerID, annotationID, sessionID=None,
     data = {"sessionID": sessionID, "pathOrUid": slideRef,
             "layerID": layerID, "annotationID": annotationID}
 
-    r = requests.get(url, params=data, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, params=data, verify=verify)
     if pma._pma_debug == True:
         print(r.url)
     if (r.status_code != 200):
@@ -1888,7 +3745,7 @@ def get_annotation_distance(slideRef, layerID, annotationID, sessionID=None, ver
     data = {"sessionID": sessionID, "pathOrUid": slideRef,
             "layerID": layerID, "annotationID": annotationID}
 
-    r = requests.get(url, params=data, verify=verify)
+    r = pma._pma_http_request("GET", url, sessionID, params=data, verify=verify)
     if pma._pma_debug == True:
         print(r.url)
     if (r.status_code != 200):
@@ -1925,6 +3782,7 @@ def _get_slide_package_size(slide_path: str) -> tuple[int, int]:
 
     return total_size, max_size
 
+@pma._pma_traced
 async def upload(
         *,
         pma_core_url: str,
@@ -1932,6 +3790,7 @@ async def upload(
         slide_path: str,
         upload_directory: str,
         progress_callback=None,
+        timeout=None,
 ):
     """
     Main upload entry point.
@@ -1940,7 +3799,13 @@ async def upload(
     - calculates full slide size (file + folder + nested files)
     - detects server upload type
     - routes upload to legacy transfer or large file uploader
+
+    timeout is the total number of seconds the upload may take (default: no limit)
     """
+    if timeout is not None:
+        with pma._pma_deadline_scope(timeout):
+            return await upload(pma_core_url=pma_core_url, session_id=session_id, slide_path=slide_path,
+                                upload_directory=upload_directory, progress_callback=progress_callback)
 
     if not os.path.isfile(slide_path):
         return False, f"File not found: {slide_path}"
@@ -2021,7 +3886,8 @@ async def upload(
 # **************************************#
 #   === Small Files < 5bg Uploader  === #
 # **************************************#
-def upload_legacy(slide_path, upload_directory, session_id, progress_callback=None, verify=True):
+@pma._pma_traced
+def upload_legacy(slide_path, upload_directory, session_id, progress_callback=None, verify=True, timeout=None):
     """
     Synchronous upload implementation using direct HTTP requests.
 
@@ -2030,7 +3896,12 @@ def upload_legacy(slide_path, upload_directory, session_id, progress_callback=No
     - non-chunked cloud uploads
     - single-file and multi-file slides (MRXS, VSI, etc.)
     - global progress aggregation across all uploaded files
+
+    timeout is the total number of seconds the upload may take (default: no limit)
     """
+    if timeout is not None:
+        with pma._pma_deadline_scope(timeout):
+            return upload_legacy(slide_path, upload_directory, session_id, progress_callback, verify)
 
     if not upload_directory:
         raise ValueError("target_folder cannot be empty")
@@ -2083,7 +3954,7 @@ def upload_legacy(slide_path, upload_directory, session_id, progress_callback=No
 
     data = {"Path": upload_directory, "Files": uploadFiles}
 
-    uploadHeaderResponse = requests.post(url, json=data, verify=verify)
+    uploadHeaderResponse = pma._pma_http_request("POST", url, sessionID, json=data, verify=verify)
     if not uploadHeaderResponse.status_code == 200:
         print(uploadHeaderResponse.json())
         raise Exception(uploadHeaderResponse.json()["Message"])
@@ -2130,25 +4001,25 @@ def upload_legacy(slide_path, upload_directory, session_id, progress_callback=No
 
         r = None
         if not isAmazonUpload:
-            r = requests.post(uploadUrl, data=monitor, headers={
+            r = pma._pma_http_request("POST", uploadUrl, sessionID, data=monitor, headers={
                 'Content-Type': monitor.content_type},
-                              verify=verify)
+                                      verify=verify)
         else:
             headers = {'Content-Length': str(f["Length"])}
             if uploadHeader['UploadType'] == 2:
                 headers = {
                     'Content-Length': str(f["Length"]), 'x-ms-blob-type': 'BlockBlob'}
 
-            r = requests.put(uploadUrl, data=UploadChunksIterator(
+            r = pma._pma_http_request("PUT", uploadUrl, sessionID, data=UploadChunksIterator(
                 open(f["FullPath"], 'rb'), f["Path"], f["Length"], iterator_callback), headers=headers, verify=verify)
 
         if r.status_code < 200 or r.status_code >= 300:
             raise Exception("Error uploading file {0}: {1} \r\n{2}: {3}".format(
                 f["Path"], uploadUrl, r.status_code, r.text))
 
-        uploadFinalizeResponse = requests.get(_pma_url(sessionID) + "transfer/Upload/"
-                                              + pma._pma_q(uploadHeader["Id"]) + "?sessionID=" + pma._pma_q(sessionID),
-                                              verify=verify)
+        uploadFinalizeResponse = pma._pma_http_request("GET", _pma_url(sessionID) + "transfer/Upload/"
+                                                       + pma._pma_q(uploadHeader["Id"]) + "?sessionID=" + pma._pma_q(sessionID),
+                                                       sessionID, verify=verify)
         if uploadFinalizeResponse.status_code < 200 or uploadFinalizeResponse.status_code >= 300:
             print(uploadFinalizeResponse.json())
             raise Exception(uploadFinalizeResponse.json()[
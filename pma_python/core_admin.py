@@ -42,11 +42,11 @@ def _pma_check_for_pma_start(method="", url=None, session=None):
                 "PMA.core.lite not found, and besides; it doesn't support an administrative back-end anyway")
 
 
-def _pma_http_post(url, data, verify=True):
+def _pma_http_post(url, data, verify=True, sessionID=None):
     if (pma._pma_debug is True):
         print("Posting to", url)
         print("   with payload", data)
-    resp = requests.post(url, json=data, verify=verify)
+    resp = pma._pma_http_request("POST", url, sessionID, json=data, verify=verify)
     if pma._pma_debug is True and "code" in resp.text:
         print(resp.text)
     else:
@@ -89,8 +89,8 @@ def admin_connect(pmacoreURL, pmacoreAdmUsername, pmacoreAdmPassword):
         core._pma_usernames[admSessionID] = pmacoreAdmUsername
 
         if not (admSessionID in core._pma_slideinfos):
-            core._pma_slideinfos[admSessionID] = dict()
-        core._pma_amount_of_data_downloaded[admSessionID] = len(loginresult)
+            core._pma_slideinfos[admSessionID] = core._pma_new_slideinfo_cache()
+        pma._pma_http_session(admSessionID)
 
     return (admSessionID)
 
@@ -109,7 +109,7 @@ def send_email_reminder(admSessionID, login, subject="PMA.core password reminder
     reminderParams = {"username": login,
                       "subject": subject, "messageTemplate": ""}
     url = _pma_admin_url(admSessionID) + "EmailPassword"
-    reminderResponse = _pma_http_post(url, reminderParams)
+    reminderResponse = _pma_http_post(url, reminderParams, sessionID=admSessionID)
     return reminderResponse
 
 
@@ -130,7 +130,7 @@ def add_user(admSessionID, login, firstName, lastName, email, pwd, canAnnotate=F
         }
     }
     url = _pma_admin_url(admSessionID) + "CreateUser"
-    createUserResponse = _pma_http_post(url, createUserParams)
+    createUserResponse = _pma_http_post(url, createUserParams, sessionID=admSessionID)
     return createUserResponse
 
 
@@ -139,7 +139,7 @@ def user_exists(admSessionID, u):
     url = (_pma_admin_url(admSessionID) + "SearchUsers?source=Local" +
            "&SessionID=" + pma._pma_q(admSessionID) + "&query=" + pma._pma_q(u))
     try:
-        r = pma._pma_http_get(url, {'Accept': 'application/json'})
+        r = pma._pma_http_get(url, {'Accept': 'application/json'}, sessionID=admSessionID)
     except Exception as e:
         print(e)
         return None
@@ -220,8 +220,8 @@ def create_root_directory(admSessionID,
         }
     }
     url = _pma_admin_url(admSessionID) + "CreateRootDirectory"
-    createRootDirectoryReponse = requests.post(
-        url, json=createRootDirectoryParams, verify=verify)
+    createRootDirectoryReponse = pma._pma_http_request(
+        "POST", url, admSessionID, json=createRootDirectoryParams, verify=verify)
     return createRootDirectoryReponse.text
 
 
@@ -233,7 +233,7 @@ def create_directory(admSessionID, path):
         return False
     except Exception:
         url = _pma_admin_url(admSessionID) + "CreateDirectory"
-        result = _pma_http_post(url, {"sessionID": admSessionID, "path": path})
+        result = _pma_http_post(url, {"sessionID": admSessionID, "path": path}, sessionID=admSessionID)
 
     try:
         return len(core.get_slides(path)) == 0
@@ -245,7 +245,7 @@ def rename_directory(admSessionID, originalPath, newName):
     url = _pma_admin_url(admSessionID) + "RenameDirectory"
     payload = {"sessionID": admSessionID,
                "path": originalPath, "newName": newName}
-    result = _pma_http_post(url, payload)
+    result = _pma_http_post(url, payload, sessionID=admSessionID)
     if "Code" in result:
         if pma._pma_debug is True:
             print(result)
@@ -262,7 +262,7 @@ def delete_directory(admSessionID, path):
         "sessionID": admSessionID,
         "path": path,
     }
-    result = _pma_http_post(url, payload)
+    result = _pma_http_post(url, payload, sessionID=admSessionID)
     if "Code" in result:
         if pma._pma_debug is True:
             print(result)
@@ -279,7 +279,7 @@ def delete_slide(admSessionID, slideRef):
         "sessionID": admSessionID,
         "path": slideRef,
     }
-    result = _pma_http_post(url, payload)
+    result = _pma_http_post(url, payload, sessionID=admSessionID)
     if "Code" in result:
         if pma._pma_debug is True:
             print(result)
@@ -304,7 +304,7 @@ def reverse_uid(admSessionID, slideRefUid, verify=True):
         pma._pma_q(admSessionID) + "&uid=" + pma._pma_q(slideRefUid)
     if (pma._pma_debug is True):
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, admSessionID, verify=verify)
     json = r.json()
     if ("Code" in json):
         raise Exception("reverse_uid on  " + slideRefUid +
@@ -331,7 +331,7 @@ def reverse_root_directory(admSessionID, alias, verify=True):
         pma._pma_q(admSessionID) + "&alias=" + pma._pma_q(alias)
     if (pma._pma_debug is True):
         print(url)
-    r = requests.get(url, verify=verify)
+    r = pma._pma_http_request("GET", url, admSessionID, verify=verify)
     json = r.json()
     if ("Code" in json):
         raise Exception("reverse_root_directory on  " +
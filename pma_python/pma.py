@@ -1,15 +1,62 @@
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import functools
+import inspect
+import itertools
+import json
 import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from os.path import join
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit
 from pma_python import version
 
 import requests
+from requests.adapters import HTTPAdapter
 
 __version__ = version.__version__
 
 _pma_url_content = {}
 _pma_debug = False
 
+# pooled HTTP sessions, one per sessionID (None is used for calls that don't belong to a session yet)
+_pma_http_sessions = {}
+_pma_http_sessions_lock = threading.Lock()
+_pma_http_pool_size = 10
+
+# retry policy for idempotent requests and circuit breaker settings; see _pma_set_retry_policy()
+_pma_retry_policy = {
+    "retries": 3,
+    "backoff": 0.5,
+    "max_backoff": 30.0,
+    "status_forcelist": (429, 500, 502, 503, 504),
+    "methods": ("GET", "HEAD", "OPTIONS"),
+    "breaker_threshold": 10,
+    "breaker_cooldown": 30.0,
+}
+# default (connect, read) timeout in seconds for every request; see _pma_set_timeout()
+_pma_timeout = (10, 300)
+# absolute time.monotonic() by which the current operation has to be done; see _pma_deadline_scope()
+_pma_deadline = contextvars.ContextVar("pma_python_deadline", default=None)
+
+# request statistics per (sessionID, endpoint); see _pma_record_request()
+_pma_stats = {}
+_pma_stats_lock = threading.Lock()
+# upper bounds (in seconds) of the latency histogram buckets: 10% apart, from 0.1 ms up to about 11 minutes
+_pma_latency_buckets = [0.0001 * 1.1 ** i for i in range(165)]
+
+# callables that receive an event dictionary when a request or API call starts or ends; see _pma_add_hook()
+_pma_hooks = []
+_pma_hook_ids = itertools.count(1)
+
+# per-server circuit breaker state: consecutive failures and the time at which the circuit was opened
+_pma_breakers = {}
+_pma_breakers_lock = threading.Lock()
+
 
 def _pma_join(*s):
     joinstring = ""
@@ -26,14 +73,609 @@ def _pma_q(arg):
         return quote(str(arg), safe='')
 
 
-def _pma_http_get(url, headers, verify=True):
+def _pma_http_session(sessionID=None):
+    """
+    Return the pooled requests.Session that belongs to sessionID, creating it when needed.
+    Re-using the same session across calls keeps TCP (and TLS) connections alive between requests
+    """
+    global _pma_http_sessions
+
+    with _pma_http_sessions_lock:
+        session = _pma_http_sessions.get(sessionID)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_pma_http_pool_size, pool_maxsize=_pma_http_pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _pma_http_sessions[sessionID] = session
+    return session
+
+
+def _pma_close_http_session(sessionID=None):
+    """
+    Close the pooled requests.Session that belongs to sessionID (if any) and release its connections
+    """
+    global _pma_http_sessions
+
+    with _pma_http_sessions_lock:
+        session = _pma_http_sessions.pop(sessionID, None)
+    if session is not None:
+        session.close()
+
+
+def _pma_set_http_pool_size(size):
+    """
+    Set the maximum number of connections that are kept alive per host for every session.
+    Existing sessions are closed; they are re-created with the new pool size on their next use
+    """
+    global _pma_http_pool_size
+
+    if not isinstance(size, int) or size < 1:
+        raise ValueError("size argument must be a positive integer")
+    _pma_http_pool_size = size
+    for sessionID in list(_pma_http_sessions.keys()):
+        _pma_close_http_session(sessionID)
+
+
+def _pma_endpoint(url):
+    """
+    Name under which requests to url are counted: the last part of the path that isn't a number
+    ('tile', 'region', 'GetImageInfo', ...); all transfers are counted as either 'upload' or 'download'
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s and not s.isdigit()]
+    lowered = [s.lower() for s in segments]
+    if "transfer" in lowered:
+        following = lowered[lowered.index("transfer") + 1:]
+        if following and following[0].startswith("download"):
+            return "download"
+        return "upload"
+    return segments[-1] if segments else ""
+
+
+def _pma_record_request(sessionID, endpoint, elapsed, bytes_received=0, bytes_sent=0, error=False):
+    """
+    Account for a single request (attempt): its latency in seconds, the bytes it transferred and whether it failed
+    """
+    bucket = bisect.bisect_left(_pma_latency_buckets, elapsed)
+    with _pma_stats_lock:
+        stats = _pma_stats.get((sessionID, endpoint))
+        if stats is None:
+            stats = {"requests": 0, "errors": 0, "bytes_received": 0, "bytes_sent": 0, "latency_total": 0.0,
+                     "latency_max": 0.0, "histogram": [0] * (len(_pma_latency_buckets) + 1)}
+            _pma_stats[(sessionID, endpoint)] = stats
+        stats["requests"] += 1
+        stats["errors"] += 1 if error else 0
+        stats["bytes_received"] += bytes_received
+        stats["bytes_sent"] += bytes_sent
+        stats["latency_total"] += elapsed
+        stats["latency_max"] = max(stats["latency_max"], elapsed)
+        stats["histogram"][bucket] += 1
+
+
+def _pma_summarize_stats(entries):
+    """
+    Combine raw statistics into counters plus latency percentiles (estimated from the histogram, in seconds)
+    """
+    histogram = [0] * (len(_pma_latency_buckets) + 1)
+    summary = {"requests": 0, "errors": 0, "bytes_received": 0, "bytes_sent": 0}
+    latency_total, latency_max = 0.0, 0.0
+    for stats in entries:
+        for key in summary:
+            summary[key] += stats[key]
+        latency_total += stats["latency_total"]
+        latency_max = max(latency_max, stats["latency_max"])
+        histogram = [a + b for (a, b) in zip(histogram, stats["histogram"])]
+
+    def percentile(fraction):
+        if summary["requests"] == 0:
+            return None
+        rank = fraction * summary["requests"]
+        seen = 0
+        for (bucket, count) in enumerate(histogram):
+            seen += count
+            if seen >= rank and count > 0:
+                return min(_pma_latency_buckets[bucket] if bucket < len(_pma_latency_buckets) else latency_max,
+                           latency_max)
+        return latency_max
+
+    summary["latency"] = {
+        "mean": latency_total / summary["requests"] if summary["requests"] else None,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": latency_max if summary["requests"] else None,
+    }
+    return summary
+
+
+def _pma_get_stats():
+    """
+    Return {sessionID: {endpoint: summary, ..., "total": summary}} for all requests recorded so far
+    """
+    with _pma_stats_lock:
+        snapshot = {key: dict(stats, histogram=list(stats["histogram"])) for (key, stats) in _pma_stats.items()}
+    result = {}
+    for ((sessionID, endpoint), stats) in snapshot.items():
+        result.setdefault(sessionID, {})[endpoint] = stats
+    for (sessionID, endpoints) in result.items():
+        raw = list(endpoints.values())
+        result[sessionID] = {endpoint: _pma_summarize_stats([stats]) for (endpoint, stats) in endpoints.items()}
+        result[sessionID]["total"] = _pma_summarize_stats(raw)
+    return result
+
+
+def _pma_bytes_received(sessionID):
+    """
+    Total number of bytes received for sessionID
+    """
+    with _pma_stats_lock:
+        return sum(stats["bytes_received"] for ((sid, _), stats) in _pma_stats.items() if sid == sessionID)
+
+
+def _pma_reset_stats(sessionID=None, all_sessions=True):
+    """
+    Forget the recorded statistics, for all sessions or (with all_sessions False) only those of sessionID
+    """
+    with _pma_stats_lock:
+        for key in list(_pma_stats.keys()):
+            if all_sessions or key[0] == sessionID:
+                del _pma_stats[key]
+
+
+def _pma_add_hook(hook):
+    """
+    Register hook, a callable that is called with an event dictionary:
+    - {"phase": "start", "id", "kind", "name", "sessionID", "time", "thread", "task", ...} when an outgoing HTTP
+      request (kind 'http'; with "method" and "url", the URL without query string) or a public API call
+      (kind 'call'; with "async" True for coroutines, generators and async generators) starts
+    - the same dictionary with "phase" "end" and "duration", "error" (None or the exception), and for HTTP requests
+      "status", "bytes_received" and "bytes_sent" when it ends
+    - {"phase": "instant", "kind": "cache", "name", "hit", "cache", "time", "thread", "task"} for tile cache lookups
+    Times are time.perf_counter() values, durations are in seconds. Hooks run on the thread that does the work
+    and should be fast; exceptions raised by hooks are ignored
+    """
+    global _pma_hooks
+    if not callable(hook):
+        raise ValueError("hook must be callable")
+    _pma_hooks = _pma_hooks + [hook]
+
+
+def _pma_remove_hook(hook):
+    """
+    Unregister a hook that was registered through _pma_add_hook()
+    """
+    global _pma_hooks
+    _pma_hooks = [h for h in _pma_hooks if h != hook]
+
+
+def _pma_emit(event):
+    """
+    Hand event to all registered hooks
+    """
+    for hook in _pma_hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            if _pma_debug is True:
+                print("Hook", hook, "failed:", e)
+
+
+def _pma_event(phase, kind, name, sessionID=None, **fields):
+    """
+    Build an event dictionary for _pma_emit()
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    event = {"phase": phase, "kind": kind, "name": name, "sessionID": sessionID, "time": time.perf_counter(),
+             "thread": threading.get_ident(), "task": None if task is None else id(task)}
+    event.update(fields)
+    return event
+
+
+def _pma_start_event(kind, name, sessionID=None, **fields):
+    """
+    Emit the start event of a request or call; returns the event to pass on to _pma_end_event() (or None without
+    hooks)
+    """
+    if not _pma_hooks:
+        return None
+    event = _pma_event("start", kind, name, sessionID, id=next(_pma_hook_ids), **fields)
+    _pma_emit(event)
+    return event
+
+
+def _pma_end_event(start, error=None, **fields):
+    """
+    Emit the end event that belongs to start (as returned by _pma_start_event())
+    """
+    if start is None:
+        return
+    now = time.perf_counter()
+    event = dict(start, phase="end", time=now, duration=now - start["time"], error=error, **fields)
+    _pma_emit(event)
+
+
+def _pma_instant_event(kind, name, sessionID=None, **fields):
+    """
+    Emit an event that has no duration, like a cache lookup
+    """
+    if _pma_hooks:
+        _pma_emit(_pma_event("instant", kind, name, sessionID, **fields))
+
+
+def _pma_traced(fn):
+    """
+    Decorator that makes a public API function emit start and end events (see _pma_add_hook()).
+    For generators and async generators the call lasts from the first item that is requested until the generator
+    is exhausted or closed; without hooks, fn is called directly
+    """
+    signature = inspect.signature(fn)
+    name = fn.__name__
+
+    def session_of(args, kwargs):
+        try:
+            bound = signature.bind_partial(*args, **kwargs)
+        except TypeError:
+            return None
+        return bound.arguments.get("sessionID", bound.arguments.get("session_id"))
+
+    if inspect.isasyncgenfunction(fn):
+        async def traced(args, kwargs):
+            start = _pma_start_event("call", name, session_of(args, kwargs), **{"async": True})
+            error = None
+            try:
+                async for item in fn(*args, **kwargs):
+                    yield item
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _pma_end_event(start, error)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _pma_hooks:
+                return fn(*args, **kwargs)
+            return traced(args, kwargs)
+    elif inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = _pma_start_event("call", name, session_of(args, kwargs), **{"async": True}) \
+                if _pma_hooks else None
+            error = None
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _pma_end_event(start, error)
+    elif inspect.isgeneratorfunction(fn):
+        def traced(args, kwargs):
+            start = _pma_start_event("call", name, session_of(args, kwargs), **{"async": True})
+            error = None
+            try:
+                yield from fn(*args, **kwargs)
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _pma_end_event(start, error)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _pma_hooks:
+                return fn(*args, **kwargs)
+            return traced(args, kwargs)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _pma_hooks:
+                return fn(*args, **kwargs)
+            start = _pma_start_event("call", name, session_of(args, kwargs))
+            error = None
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                _pma_end_event(start, error)
+    return wrapper
+
+
+class _PmaChromeTrace:
+    """
+    Hook that collects events into a Chrome trace / Perfetto timeline (the JSON trace event format).
+    Synchronous calls and HTTP requests become complete events on the track of their thread; coroutines and
+    generators, which can be suspended and resumed, become async events on a track of their own
+    """
+
+    def __init__(self):
+        self.events = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        ts = (event["time"] - self.origin) * 1e6
+        args = {k: (v if isinstance(v, (str, int, float, bool)) or v is None else repr(v))
+                for (k, v) in event.items() if k not in ("phase", "time", "thread", "task", "id", "name", "kind")}
+        tid = event["thread"] if event["task"] is None else event["task"]
+        if event["phase"] == "instant":
+            record = [{"name": event["name"] + (" hit" if event.get("hit") else " miss"), "cat": event["kind"],
+                       "ph": "i", "s": "t", "ts": ts, "pid": os.getpid(), "tid": tid, "args": args}]
+        elif event["phase"] == "end" and event.get("async"):
+            record = [{"name": event["name"], "cat": event["kind"], "ph": "b", "id": event["id"],
+                       "ts": ts - event["duration"] * 1e6, "pid": os.getpid(), "tid": tid},
+                      {"name": event["name"], "cat": event["kind"], "ph": "e", "id": event["id"], "ts": ts,
+                       "pid": os.getpid(), "tid": tid, "args": args}]
+        elif event["phase"] == "end":
+            record = [{"name": event["name"], "cat": event["kind"], "ph": "X", "ts": ts - event["duration"] * 1e6,
+                       "dur": event["duration"] * 1e6, "pid": os.getpid(), "tid": tid, "args": args}]
+        else:
+            return
+        with self.lock:
+            self.events.extend(record)
+
+    def write(self, path):
+        with self.lock:
+            events = list(self.events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+def _pma_set_timeout(timeout):
+    """
+    Set the default timeout for every request: a number of seconds, a (connect, read) tuple, or None to wait forever
+    """
+    global _pma_timeout
+
+    values = timeout if isinstance(timeout, tuple) else (timeout,)
+    if len(values) not in (1, 2) or any(v is not None and (not isinstance(v, (int, float)) or v <= 0) for v in values):
+        raise ValueError("timeout argument must be None, a positive number or a (connect, read) tuple of those")
+    _pma_timeout = timeout
+
+
+@contextlib.contextmanager
+def _pma_deadline_scope(seconds=None, until=None):
+    """
+    Context manager that gives all requests made within it (also from worker threads started through
+    pma_python's own concurrency helpers) a shared time budget of seconds, or until the absolute
+    time.monotonic() value until. Nested scopes can only shorten the budget. Yields the absolute deadline
+    """
+    current = _pma_deadline.get()
+    deadline = current
+    if seconds is not None:
+        until = time.monotonic() + seconds if until is None else min(until, time.monotonic() + seconds)
+    if until is not None:
+        deadline = until if current is None else min(current, until)
+    token = _pma_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _pma_deadline.reset(token)
+
+
+def _pma_remaining_time():
+    """
+    Seconds left until the deadline of the current scope (None when there is no deadline).
+    Raises requests.exceptions.Timeout when the deadline has passed
+    """
+    deadline = _pma_deadline.get()
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise requests.exceptions.Timeout("Deadline exceeded")
+    return remaining
+
+
+def _pma_request_timeout(timeout=None):
+    """
+    The timeout to pass on to a single request: timeout (or the default timeout when None),
+    shortened to what is left of the deadline of the current scope
+    """
+    if timeout is None:
+        timeout = _pma_timeout
+    remaining = _pma_remaining_time()
+    if remaining is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _pma_set_retry_policy(retries=3, backoff=0.5, max_backoff=30.0, status_forcelist=(429, 500, 502, 503, 504),
+                          breaker_threshold=10, breaker_cooldown=30.0):
+    """
+    Configure how idempotent requests (GET, HEAD, OPTIONS) are retried after a dropped connection, a timeout or
+    a response with a status code in status_forcelist: at most retries times, waiting a random time of up to
+    backoff * 2 ** attempt seconds (capped at max_backoff) or as long as the server asks for through Retry-After.
+    After breaker_threshold consecutive failures the circuit for that server opens and requests to it fail
+    immediately for breaker_cooldown seconds, after which a trial request is let through.
+    Set retries to 0 to disable retrying, breaker_threshold to 0 to disable the circuit breaker
+    """
+    global _pma_retry_policy
+
+    if not isinstance(retries, int) or retries < 0:
+        raise ValueError("retries argument must be a non-negative integer")
+    if backoff < 0 or max_backoff < 0 or breaker_cooldown < 0:
+        raise ValueError("backoff, max_backoff and breaker_cooldown arguments must be non-negative")
+    if not isinstance(breaker_threshold, int) or breaker_threshold < 0:
+        raise ValueError("breaker_threshold argument must be a non-negative integer")
+    _pma_retry_policy = dict(_pma_retry_policy, retries=retries, backoff=backoff, max_backoff=max_backoff,
+                             status_forcelist=tuple(status_forcelist), breaker_threshold=breaker_threshold,
+                             breaker_cooldown=breaker_cooldown)
+    with _pma_breakers_lock:
+        _pma_breakers.clear()
+
+
+def _pma_breaker_check(server, policy):
+    """
+    Raise when the circuit for server is open; let a single trial request through once the cooldown has passed
+    """
+    if policy["breaker_threshold"] <= 0:
+        return
+    with _pma_breakers_lock:
+        state = _pma_breakers.get(server)
+        if state is None or state["opened"] is None:
+            return
+        if time.monotonic() - state["opened"] < policy["breaker_cooldown"]:
+            raise requests.exceptions.ConnectionError(
+                "Circuit breaker open for " + server + " after " + str(state["failures"]) + " consecutive failures")
+        # half-open: restart the cooldown, so concurrent callers keep failing fast while this trial request runs
+        state["opened"] = time.monotonic()
+
+
+def _pma_breaker_record(server, success, policy):
+    """
+    Record the outcome of a request to server, opening or closing its circuit as needed
+    """
+    if policy["breaker_threshold"] <= 0:
+        return
+    with _pma_breakers_lock:
+        state = _pma_breakers.setdefault(server, {"failures": 0, "opened": None})
+        if success:
+            state["failures"] = 0
+            state["opened"] = None
+        else:
+            state["failures"] += 1
+            if state["failures"] >= policy["breaker_threshold"]:
+                state["opened"] = time.monotonic()
+
+
+def _pma_retry_delay(attempt, response, policy):
+    """
+    Number of seconds to wait before the next attempt: what the server asked for through Retry-After,
+    or else exponential backoff with full jitter
+    """
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(0.0, delay), policy["max_backoff"])
+    return random.uniform(0, min(policy["max_backoff"], policy["backoff"] * (2 ** attempt)))
+
+
+def _pma_fits_deadline(delay):
+    """
+    Whether there is still time to wait delay seconds before the deadline of the current scope passes
+    """
+    deadline = _pma_deadline.get()
+    return deadline is None or time.monotonic() + delay < deadline
+
+
+def _pma_deadline_shortens(timeout=None, connect=False):
+    """
+    Whether what is left of the deadline of the current scope is shorter than the read (or connect) timeout
+    of a request. When such a request times out, the caller ran out of time, which says nothing about the server
+    """
+    deadline = _pma_deadline.get()
+    if deadline is None:
+        return False
+    if timeout is None:
+        timeout = _pma_timeout
+    if isinstance(timeout, tuple):
+        timeout = timeout[0] if connect else timeout[-1]
+    return timeout is None or deadline - time.monotonic() < timeout
+
+
+def _pma_request_with_retry(session, method, url, **kwargs):
+    """
+    Perform an HTTP request through session (a requests.Session, or the requests module itself),
+    applying the timeout, the deadline of the current scope, the retry policy and the circuit breaker
+    of the server that url points to.
+    retries overrides the number of retries of the policy; breaker=False bypasses the circuit breaker (for probes
+    that find out whether a server is there at all, where a refused connection is a normal answer)
+    """
+    policy = _pma_retry_policy
+    timeout = kwargs.pop("timeout", None)
+    sessionID = kwargs.pop("sessionID", None)
+    endpoint = kwargs.pop("endpoint", None) or _pma_endpoint(url)
+    retries = kwargs.pop("retries", None)
+    if retries is None:
+        retries = policy["retries"]
+    if not kwargs.pop("breaker", True):
+        policy = dict(policy, breaker_threshold=0)
+    if method.upper() not in policy["methods"]:
+        retries = 0
+    parts = urlsplit(url)
+    server = parts.scheme + "://" + parts.netloc
+
+    attempt = 0
+    while True:
+        _pma_breaker_check(server, policy)
+        request_timeout = _pma_request_timeout(timeout)
+        shortened = (_pma_deadline_shortens(timeout, connect=True), _pma_deadline_shortens(timeout))
+        event = _pma_start_event("http", endpoint, sessionID, method=method, url=server + parts.path)
+        start = time.perf_counter()
+        try:
+            r = session.request(method, url, timeout=request_timeout, **kwargs)
+        except Exception as e:
+            _pma_record_request(sessionID, endpoint, time.perf_counter() - start, error=True)
+            _pma_end_event(event, e, status=None, bytes_received=0, bytes_sent=0)
+            if not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                raise
+            if isinstance(e, requests.exceptions.Timeout) and \
+                    (shortened[0 if isinstance(e, requests.exceptions.ConnectTimeout) else 1] or
+                     not _pma_fits_deadline(0)):
+                # the deadline ran out, not the server: don't count this against its circuit breaker
+                raise
+            _pma_breaker_record(server, False, policy)
+            delay = _pma_retry_delay(attempt, None, policy)
+            if attempt >= retries or not _pma_fits_deadline(delay):
+                raise
+        else:
+            if kwargs.get("stream"):
+                # the body hasn't been read yet; go by what the server announced
+                received = int(r.headers.get("Content-Length") or 0)
+            else:
+                received = len(r.content)
+            sent = int(r.request.headers.get("Content-Length") or 0)
+            _pma_record_request(sessionID, endpoint, time.perf_counter() - start, received, sent,
+                                r.status_code >= 400)
+            _pma_end_event(event, None, status=r.status_code, bytes_received=received, bytes_sent=sent)
+            if r.status_code not in policy["status_forcelist"]:
+                _pma_breaker_record(server, True, policy)
+                return r
+            _pma_breaker_record(server, False, policy)
+            delay = _pma_retry_delay(attempt, r, policy)
+            if attempt >= retries or not _pma_fits_deadline(delay):
+                return r
+            r.close()
+        if _pma_debug is True:
+            print("Retrying", method, url, "in", round(delay, 2), "seconds")
+        time.sleep(delay)
+        attempt += 1
+
+
+def _pma_http_request(method, url, sessionID=None, **kwargs):
+    """
+    Perform an HTTP request through the pooled session that belongs to sessionID
+    Idempotent requests are retried on transient failures; see _pma_set_retry_policy()
+    """
+    return _pma_request_with_retry(_pma_http_session(sessionID), method, url, sessionID=sessionID, **kwargs)
+
+
+def _pma_http_get(url, headers, verify=True, sessionID=None):
     global _pma_url_content
     global _pma_debug
 
     if not (url in _pma_url_content):
         if _pma_debug is True:
             print("Retrieving ", url)
-        r = requests.get(url, headers=headers, verify=verify)
+        r = _pma_http_request("GET", url, sessionID, headers=headers, verify=verify)
         _pma_url_content[url] = r
 
     return _pma_url_content[url]
@@ -69,7 +711,7 @@ def get_supported_formats(pandas=False, verify=True):
         print(url)
 
     headers = {'Accept': 'application/json'}
-    r = requests.get(url, headers=headers, verify=verify)
+    r = _pma_http_request("GET", url, headers=headers, verify=verify)
     json = r.json()
 
     if (pandas == True):
@@ -1,4 +1,5 @@
 import asyncio
+import time
 
 import requests
 import json
@@ -7,8 +8,11 @@ from urllib.parse import urljoin, quote
 from typing import Callable
 import ssl
 from requests.adapters import HTTPAdapter
+import urllib3
 from urllib3.poolmanager import PoolManager
 
+from . import pma
+
 
 UploadProgressCallback = Callable[[int, int], None]
 
@@ -181,7 +185,7 @@ class PmaCoreClient:
     def authenticate(self, username: str, password: str, caller: str) -> AuthenticateResponse:
         service_url = urljoin(self.server_url, 'api/json/Authenticate')
         params = {'username': username, 'password': password, 'caller': caller}
-        response = requests.get(service_url, params=params)
+        response = pma._pma_request_with_retry(requests, "GET", service_url, params=params)
         response.raise_for_status()
         return self._parse_json(response.text, AuthenticateResponse)
 
@@ -191,11 +195,14 @@ class PmaCoreClient:
         params = {'sessionId': session_id}
         data = json.dumps(upload_model, default=lambda o: o.__dict__)
         response = await asyncio.to_thread(
-            requests.post,
+            pma._pma_request_with_retry,
+            requests,
+            "POST",
             url,
             params=params,
             headers=headers,
-            data=data
+            data=data,
+            sessionID=session_id
         )
         response.raise_for_status()
         return UploadResponse(**response.json())
@@ -211,6 +218,7 @@ class PmaCoreClient:
                 stream,
                 total_bytes=total_bytes,
                 progress_callback=progress_callback,
+                session_id=session_id,
             )
             return
 
@@ -235,14 +243,18 @@ class PmaCoreClient:
 
             http = urllib3.PoolManager()
 
+            start = time.perf_counter()
             response = await asyncio.to_thread(
                 http.request,
                 "PUT",
                 upload_url,
                 body=data,
                 headers=headers,
-                preload_content=False
+                preload_content=False,
+                timeout=self._urllib3_timeout()
             )
+            pma._pma_record_request(session_id, "upload", time.perf_counter() - start, 0, len(data),
+                                    response.status >= 300)
 
             if response.status >= 300:
                 raise Exception(f"S3 upload failed: {response.status}")
@@ -254,10 +266,13 @@ class PmaCoreClient:
 
         files = {"file": (relative_path.split("/")[-1], wrapped, "application/octet-stream")}
         response = await asyncio.to_thread(
-            requests.post,
+            pma._pma_request_with_retry,
+            requests,
+            "POST",
             url,
             params=params,
-            files=files
+            files=files,
+            sessionID=session_id
         )
         response.raise_for_status()
 
@@ -265,9 +280,12 @@ class PmaCoreClient:
         service_url = f"{self.server_url}transfer/Upload/{id}"
         params = {'sessionId': session_id}
         response = await asyncio.to_thread(
-            requests.get,
+            pma._pma_request_with_retry,
+            requests,
+            "GET",
             service_url,
-            params=params
+            params=params,
+            sessionID=session_id
         )
         response.raise_for_status()
         return json.dumps(response.json(), indent=2)
@@ -278,7 +296,8 @@ class PmaCoreClient:
         e_tags = await self.upload_parts_to_s3(
             multipart_info,
             stream,
-            progress_callback=progress_callback
+            progress_callback=progress_callback,
+            session_id=session_id
         )
         url = f"{self.server_url}transfer/Upload/CompleteMultipart"
         params = {'sessionId': session_id}
@@ -290,11 +309,14 @@ class PmaCoreClient:
         headers = {'Content-Type': 'application/json'}
         data = json.dumps(payload)
         response = await asyncio.to_thread(
-            requests.post,
+            pma._pma_request_with_retry,
+            requests,
+            "POST",
             url,
             params=params,
             headers=headers,
-            data=data
+            data=data,
+            sessionID=session_id
         )
         response.raise_for_status()
 
@@ -304,6 +326,7 @@ class PmaCoreClient:
             stream: IO,
             total_bytes: int | None = None,
             progress_callback: UploadProgressCallback | None = None,
+            session_id: str | None = None,
     ):
         block_ids: List[str] = []
         await self.upload_blocks_to_azure(
@@ -312,6 +335,7 @@ class PmaCoreClient:
             stream,
             total_bytes=total_bytes,
             progress_callback=progress_callback,
+            session_id=session_id,
         )
         headers = {
             'x-ms-blob-content-type': 'application/octet-stream',
@@ -329,7 +353,16 @@ class PmaCoreClient:
             "Connection": "Keep-Alive",
             "Keep-Alive": "3600",
         }
-        response = requests.put(commit_url, data=body, headers=headers)
+        response = await asyncio.to_thread(
+            pma._pma_request_with_retry,
+            requests,
+            "PUT",
+            commit_url,
+            data=body,
+            headers=headers,
+            sessionID=session_id,
+            endpoint="upload"
+        )
         response.raise_for_status()
 
     async def upload_blocks_to_azure(
@@ -339,6 +372,7 @@ class PmaCoreClient:
             stream: IO,
             total_bytes: int | None = None,
             progress_callback: UploadProgressCallback | None = None,
+            session_id: str | None = None,
     ):
         block_size = 4 * 1024 * 1024
         block_id = 0
@@ -366,16 +400,27 @@ class PmaCoreClient:
             }
 
             response = await asyncio.to_thread(
-                requests.put,
+                pma._pma_request_with_retry,
+                requests,
+                "PUT",
                 block_upload_url,
                 data=chunk,
-                headers=headers
+                headers=headers,
+                sessionID=session_id,
+                endpoint="upload"
             )
             response.raise_for_status()
 
             block_ids.append(base64_block_id)
             block_id += 1
 
+    @staticmethod
+    def _urllib3_timeout():
+        timeout = pma._pma_request_timeout()
+        if isinstance(timeout, tuple):
+            return urllib3.util.Timeout(connect=timeout[0], read=timeout[-1])
+        return urllib3.util.Timeout(connect=timeout, read=timeout)
+
     def _iter_file_range(self, stream: IO, start: int, length: int, buf_size: int = 8 * 1024 * 1024):
         stream.seek(start)
         remaining = length
@@ -390,7 +435,8 @@ class PmaCoreClient:
             self,
             multipart_info: MultipartFile,
             stream: IO,
-            progress_callback: UploadProgressCallback | None = None
+            progress_callback: UploadProgressCallback | None = None,
+            session_id: str | None = None
     ) -> List[PartETagModel]:
 
         if not multipart_info or not multipart_info.parts:
@@ -431,10 +477,14 @@ class PmaCoreClient:
             }
 
             response = await asyncio.to_thread(
-                self.session.put,
+                pma._pma_request_with_retry,
+                self.session,
+                "PUT",
                 part.Url,
                 data=part_buffer,
-                headers=headers
+                headers=headers,
+                sessionID=session_id,
+                endpoint="upload"
             )
 
             response.raise_for_status()
@@ -0,0 +1,180 @@
+import multiprocessing
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+
+import numpy as np
+from PIL import Image
+
+from pma_python import core
+
+__all__ = ["Patch", "PatchSampler"]
+
+Patch = namedtuple("Patch", ["slideRef", "zoomlevel", "x", "y", "size", "read_size"])
+Patch.__doc__ = """
+A patch to sample: the square of read_size pixels at (x, y) of a zoomlevel (in pixels of that zoomlevel),
+resampled to size x size pixels when read_size differs from size
+"""
+
+
+def _pma_sampler_init(context, tile_cache_bytes):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+
+    Initializer of the worker processes: every worker gets its own pooled HTTP session and tile cache
+    """
+    core._pma_restore_session_context(context)
+    if tile_cache_bytes:
+        core.enable_tile_cache(tile_cache_bytes)
+
+
+def _pma_sampler_read(job):
+    """
+    Internal methods prefixed with _pma_ are not supposed to be invoked by consumers directly
+    """
+    (patch, sessionID, format, quality, verify) = job
+    arr = core.get_region_from_tiles(patch.slideRef, patch.x, patch.y, patch.read_size, patch.read_size,
+                                     zoomlevel=patch.zoomlevel, sessionID=sessionID, format=format,
+                                     quality=quality, workers=1, verify=verify)
+    if patch.read_size != patch.size:
+        arr = np.asarray(Image.fromarray(arr).resize((patch.size, patch.size), Image.BILINEAR))
+    return arr
+
+
+class PatchSampler:
+    """
+    Sample fixed-size patches from a collection of slides, e.g. to build a training set.
+    The resolution is given as a magnification (40 = 0.25 um/pixel) or directly in micrometres per pixel (mpp);
+    patches are read from the coarsest zoomlevel that is at least that fine and resampled when needed.
+    Mode 'grid' covers every slide with patches (every stride pixels, default: patch_size), mode 'random' draws
+    n_patches patches per slide. With tissue_only, only patches of which at least tissue_threshold is covered
+    with tissue are kept (see core.get_tissue_map).
+    All patch coordinates are determined up front (see patches); iterating over the sampler streams
+    (Patch, uint8 array) pairs from a pool of worker processes (backend='process') or threads (backend='thread').
+    Worker processes are started with the 'spawn' method, so guard the calling script with
+    if __name__ == "__main__"
+    """
+
+    def __init__(self, slides, patch_size=256, magnification=None, mpp=None, mode="grid", stride=None,
+                 n_patches=100, tissue_only=False, tissue_threshold=0.5, sessionID=None, format="jpg",
+                 quality=90, workers=4, backend="process", max_in_flight=None, shuffle=False, seed=None,
+                 tile_cache_bytes=64 * 1024 * 1024, verify=True):
+        if mode not in ("grid", "random"):
+            raise ValueError("mode must be 'grid' or 'random'")
+        if backend not in ("process", "thread"):
+            raise ValueError("backend must be 'process' or 'thread'")
+        if magnification is not None and mpp is not None:
+            raise ValueError("Specify either magnification or mpp, not both")
+        if magnification is not None:
+            mpp = 10.0 / magnification
+
+        self.sessionID = core._pma_session_id(sessionID)
+        self.slides = [s[1:] if s.startswith("/") else s for s in ([slides] if isinstance(slides, str) else slides)]
+        self.patch_size = int(patch_size)
+        self.mpp = mpp
+        self.format = format
+        self.quality = quality
+        self.workers = max(1, int(workers))
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.tile_cache_bytes = tile_cache_bytes
+        self.verify = verify
+        self.patches_read = 0
+        self.seconds = 0.0
+
+        rng = np.random.default_rng(seed)
+        self.patches = []
+        for slideRef in self.slides:
+            self.patches.extend(self._slide_patches(slideRef, mode, stride, n_patches, tissue_only,
+                                                    tissue_threshold, rng))
+        if shuffle:
+            rng.shuffle(self.patches)
+
+    def _level(self, slideRef):
+        """
+        The zoomlevel to read from and the number of pixels of that zoomlevel that make up one patch
+        """
+        levels = sorted(core.get_zoomlevels_list(slideRef, self.sessionID))
+        if self.mpp is None:
+            return levels[-1], self.patch_size
+        # coarsest zoomlevel that still resolves the requested resolution; else the finest there is
+        for level in levels:
+            level_mpp = core.get_pixels_per_micrometer(slideRef, sessionID=self.sessionID, zoomlevel=level)[0]
+            if level_mpp <= self.mpp * 1.001:
+                break
+        read_size = int(round(self.patch_size * self.mpp / level_mpp))
+        return level, max(1, read_size)
+
+    def _slide_patches(self, slideRef, mode, stride, n_patches, tissue_only, tissue_threshold, rng):
+        (level, read_size) = self._level(slideRef)
+        (width, height) = (int(d) for d in core.get_pixel_dimensions(slideRef, sessionID=self.sessionID,
+                                                                     zoomlevel=level))
+        if width < read_size or height < read_size:
+            return []
+
+        tissue = None
+        if tissue_only:
+            tissue = core.get_tissue_map(slideRef, level, self.sessionID, verify=self.verify)
+            tile_size = int(core.get_slide_info(slideRef, self.sessionID, self.verify)["TileSize"])
+
+        def keep(x, y):
+            if tissue is None:
+                return True
+            cells = tissue[y // tile_size:int(ceil((y + read_size) / tile_size)),
+                           x // tile_size:int(ceil((x + read_size) / tile_size))]
+            return cells.size > 0 and cells.mean() >= tissue_threshold
+
+        if mode == "grid":
+            step = read_size if stride is None else max(1, int(round(stride * read_size / self.patch_size)))
+            coords = [(x, y) for y in range(0, height - read_size + 1, step)
+                      for x in range(0, width - read_size + 1, step)]
+            coords = [(x, y) for (x, y) in coords if keep(x, y)]
+        else:
+            coords = []
+            # rejection sampling; give up on slides that (nearly) don't have any tissue
+            for _ in range(50 * n_patches):
+                if len(coords) >= n_patches:
+                    break
+                x = int(rng.integers(0, width - read_size + 1))
+                y = int(rng.integers(0, height - read_size + 1))
+                if keep(x, y):
+                    coords.append((x, y))
+        return [Patch(slideRef, level, x, y, self.patch_size, read_size) for (x, y) in coords]
+
+    def __len__(self):
+        return len(self.patches)
+
+    def __iter__(self):
+        jobs = ((patch, self.sessionID, self.format, self.quality, self.verify) for patch in self.patches)
+        executor = None
+        if self.backend == "process":
+            context = core._pma_session_context(self.sessionID, self.slides)
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_pma_sampler_init,
+                                           initargs=(context, self.tile_cache_bytes))
+        try:
+            start = time.perf_counter()
+            for (job, arr) in core._pma_run_concurrently(_pma_sampler_read, jobs, self.workers, self.max_in_flight,
+                                                         ordered=True, executor=executor):
+                self.seconds += time.perf_counter() - start
+                self.patches_read += 1
+                yield job[0], arr
+                start = time.perf_counter()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    @property
+    def patches_per_second(self):
+        """
+        Throughput so far, not counting the time the consumer spent between patches
+        """
+        return self.patches_read / self.seconds if self.seconds > 0 else 0.0
+
+    def stats(self):
+        """
+        Return a dictionary with the number of patches read, the time spent waiting for them and the throughput
+        """
+        return {"patches": len(self.patches), "read": self.patches_read, "seconds": self.seconds,
+                "patches_per_second": self.patches_per_second}
@@ -1,6 +1,5 @@
 import os
 from urllib.parse import quote
-from urllib.request import urlopen
 from pma_python import pma
 
 import requests
@@ -29,7 +28,9 @@ def get_version_info(pmaviewURL):
         # Are we looking at PMA.view/studio 2.x?
         if pma._pma_debug is True:
             print(url)
-        contents = urlopen(url).read().decode("utf-8").strip("\"").strip("'")
+        r = pma._pma_http_request("GET", url, retries=0, breaker=False)
+        r.raise_for_status()
+        contents = r.content.decode("utf-8").strip("\"").strip("'")
         return contents
     except Exception as e:
         version = None
@@ -39,7 +40,9 @@ def get_version_info(pmaviewURL):
         # Oops, perhaps this is a PMA.view 1.x version
         if pma._pma_debug is True:
             print(url)
-        contents = urlopen(url).read().decode("utf-8").strip("\"").strip("'")
+        r = pma._pma_http_request("GET", url, retries=0, breaker=False)
+        r.raise_for_status()
+        contents = r.content.decode("utf-8").strip("\"").strip("'")
         return contents
     except Exception as e:
         version = None
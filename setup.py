@@ -36,7 +36,8 @@ setup(name='pma_python',
           'Development Status :: 3 - Alpha',
           'Programming Language :: Python :: 3'],
       keywords='wsi whole slide imaging gigapixel microscopy histology pathology digital pathology pma pma.python pathomation pma.core',
-      install_requires=['pandas', 'pillow', 'requests', 'requests_toolbelt'],
+      install_requires=['numpy', 'pandas', 'pillow', 'requests', 'requests_toolbelt'],
+      extras_require={'async': ['aiohttp']},
       python_requires='>=3',  # assume this only works in Python 3
       zip_safe=False)
 